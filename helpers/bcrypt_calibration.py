@@ -0,0 +1,66 @@
+"""
+Pick the bcrypt cost that keeps a password verification under a target time
+on this hardware, run it on the production machine type:
+
+    python -m helpers.bcrypt_calibration --target-ms 250
+"""
+
+import argparse
+import statistics
+import time
+from typing import Dict
+
+from passlib.hash import bcrypt
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure_verify_ms(rounds: int, samples: int = 5) -> float:
+    hashed = bcrypt.using(rounds=rounds).hash(SAMPLE_PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.verify(SAMPLE_PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int = 5) -> Dict[int, float]:
+    """
+    Measure increasing costs until one goes over the target
+    """
+    timings = {}
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        timings[rounds] = measure_verify_ms(rounds, samples)
+        if timings[rounds] > target_ms:
+            break
+    return timings
+
+
+def pick_rounds(timings: Dict[int, float], target_ms: float) -> int:
+    within = [rounds for rounds, ms in timings.items() if ms <= target_ms]
+    return max(within) if within else MIN_ROUNDS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = calibrate(args.target_ms, args.samples)
+    for rounds, ms in timings.items():
+        print(f"rounds {rounds:2d}: {ms:8.1f} ms")
+
+    rounds = pick_rounds(timings, args.target_ms)
+    if timings[rounds] > args.target_ms:
+        print(
+            f"even rounds {MIN_ROUNDS} exceeds {args.target_ms:.0f} ms, keep the minimum"
+        )
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict
+
+from helpers.metrics import metrics
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class BulkheadFullError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fail fast on a dependency that keeps failing.
+
+    closed    -> calls go through, consecutive failures are counted
+    open      -> calls are rejected until recovery_timeout has passed
+    half_open -> a limited number of probe calls decide whether to close again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def _before_call(self) -> None:
+        state = self.state
+        if state == self.OPEN:
+            metrics.inc(f"{self.name}_circuit_rejections")
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        if state == self.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                metrics.inc(f"{self.name}_circuit_rejections")
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open")
+            self._half_open_calls += 1
+
+    def _on_success(self) -> None:
+        if self._state != self.CLOSED:
+            logging.info(f"Circuit for {self.name} closed")
+        self._state = self.CLOSED
+        self._failures = 0
+
+    def _on_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logging.warning(
+                    f"Circuit for {self.name} opened after {self._failures} failures"
+                )
+                metrics.inc(f"{self.name}_circuit_opened")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def protect(self):
+        """
+        Guard a block that talks to the dependency, e.g. a streamed response
+        """
+        self._before_call()
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # the caller went away, this says nothing about the dependency
+            if self._state == self.HALF_OPEN:
+                self._half_open_calls -= 1
+            raise
+        except Exception:
+            self._on_failure()
+            raise
+        self._on_success()
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        async with self.protect():
+            return await func()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+        }
+
+
+class Bulkhead:
+    """
+    Cap the number of concurrent calls to a dependency so a slow dependency
+    cannot hold every connection and DB session in the worker.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_wait: float = 0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            try:
+                if self.max_wait <= 0:
+                    raise asyncio.TimeoutError()
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                metrics.inc(f"{self.name}_bulkhead_rejections")
+                raise BulkheadFullError(f"Too many concurrent calls to {self.name}")
+
+        self._active += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": self._active, "max_concurrent": self.max_concurrent}
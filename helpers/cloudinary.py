@@ -1,9 +1,11 @@
 import os
+import re
+import asyncio
 import logging
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from fastapi import UploadFile, HTTPException
 from helpers.config import settings
 
@@ -192,4 +194,92 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(e)}")
 
 
+# Cloudinary accepts at most 100 public_ids per delete_resources call
+DELETE_RESOURCES_LIMIT = 100
+
+_UPLOAD_PATH_PATTERN = re.compile(
+    r"/upload/(?:[^/]*,[^/]*/)*(?:v\d+/)?(?P<public_id>.+)$"
+)
+
+
+def public_id_from_url(url: Optional[str]) -> Optional[str]:
+    """
+    Extract the Cloudinary public_id from a delivery URL
+
+    Args:
+        url: Cloudinary secure_url, e.g. https://res.cloudinary.com/<cloud>/image/upload/v1/reports/images/abc.jpg
+
+    Returns:
+        Optional[str]: public_id without version and extension, or None if the URL is not a Cloudinary URL
+    """
+    if not url or "res.cloudinary.com" not in url:
+        return None
+    match = _UPLOAD_PATH_PATTERN.search(url.split("?", 1)[0])
+    if not match:
+        return None
+    return os.path.splitext(match.group("public_id"))[0]
+
+
+async def list_images(prefix: str, max_results: int = 500) -> List[Dict[str, Any]]:
+    """
+    List all uploaded images under a folder prefix, following pagination
+
+    Args:
+        prefix: Folder prefix, e.g. "reports/images"
+        max_results: Page size per Admin API call (max 500)
+
+    Returns:
+        List[Dict]: Cloudinary resource entries (public_id, secure_url, created_at, ...)
+    """
+    resources: List[Dict[str, Any]] = []
+    next_cursor = None
+    try:
+        while True:
+            options = {
+                "type": "upload",
+                "resource_type": "image",
+                "prefix": prefix,
+                "max_results": max_results,
+            }
+            if next_cursor:
+                options["next_cursor"] = next_cursor
+
+            result = await asyncio.to_thread(cloudinary.api.resources, **options)
+            resources.extend(result.get("resources", []))
+            next_cursor = result.get("next_cursor")
+            if not next_cursor:
+                return resources
+    except cloudinary.exceptions.Error as e:
+        logging.error(f"Cloudinary list error: {e}")
+        raise
+
+
+async def delete_images(public_ids: List[str]) -> Dict[str, Any]:
+    """
+    Bulk delete images from Cloudinary in a single Admin API call
+
+    Args:
+        public_ids: Public IDs to delete (at most DELETE_RESOURCES_LIMIT)
+
+    Returns:
+        Dict: Cloudinary delete_resources response
+    """
+    if len(public_ids) > DELETE_RESOURCES_LIMIT:
+        raise ValueError(
+            f"Cannot delete more than {DELETE_RESOURCES_LIMIT} images per call"
+        )
+    try:
+        result = await asyncio.to_thread(
+            cloudinary.api.delete_resources,
+            public_ids,
+            resource_type="image",
+            type="upload",
+        )
+        logging.info(f"Deleted {len(public_ids)} images from Cloudinary")
+        return result
+    except cloudinary.exceptions.Error as e:
+        logging.error(f"Cloudinary bulk delete error: {e}")
+        raise
+
+
 configure_cloudinary()
@@ -1,3 +1,7 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
 from fastapi import HTTPException
 from itsdangerous import URLSafeTimedSerializer, BadTimeSignature, SignatureExpired
 import cuid
@@ -5,6 +9,7 @@ from passlib.context import CryptContext
 from pydantic import EmailStr
 from helpers.jwt import JwtHelper
 from helpers.config import settings
+from helpers.metrics import metrics
 
 
 def _handle_api_response(self, response):
@@ -42,7 +47,15 @@ def generate_cuid():
     return cuid.cuid()
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# The one password context of the app. Hashes made with another cost than
+# BCRYPT_ROUNDS are reported by needs_update and rehashed on the next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -59,6 +72,87 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and return a new hash when the stored one is outdated.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt releases the GIL, so a few threads hash in parallel without
+# blocking the event loop. Work beyond the queue limit is rejected early
+# instead of piling up behind a login storm.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_jobs = 0
+_password_jobs_lock = threading.Lock()
+
+
+def _password_pool_stats() -> dict:
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "pending": _password_jobs,
+        "max_queue": settings.PASSWORD_HASH_MAX_QUEUE,
+    }
+
+
+metrics.register_gauge("password_hash_pool", _password_pool_stats)
+
+
+async def _run_password_job(func, *args):
+    global _password_jobs
+    if (
+        _password_jobs
+        >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+    ):
+        metrics.inc("password_hash_rejections")
+        raise HTTPException(
+            status_code=503, detail="Server is busy, please try again later"
+        )
+
+    with _password_jobs_lock:
+        _password_jobs += 1
+    future = password_executor.submit(func, *args)
+    # a cancelled request does not stop its thread, the job only leaves the
+    # queue once the worker is done with it
+    future.add_done_callback(_password_job_done)
+    return await asyncio.wrap_future(future)
+
+
+def _password_job_done(future: Future) -> None:
+    global _password_jobs
+    with _password_jobs_lock:
+        _password_jobs -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password on the password worker pool.
+    """
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password on the password worker pool.
+    """
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    verify_and_update_password on the password worker pool.
+    """
+    return await _run_password_job(
+        verify_and_update_password, plain_password, hashed_password
+    )
+
+
 token_algo = URLSafeTimedSerializer(
     settings.JWT_SECRET or "", salt="Email_Verification_&_Forgot_password"
 )
@@ -21,7 +21,33 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     GOOGLE_REDIRECT_URI: Optional[str] = None
+    GOOGLE_TIMEOUT: float = 10.0
+    GOOGLE_CONNECT_TIMEOUT: float = 3.0
+    GOOGLE_MAX_RETRIES: int = 2
+    GOOGLE_RETRY_BACKOFF: float = 0.5
+    GOOGLE_USE_ID_TOKEN: bool = True
+    GOOGLE_JWKS_DEFAULT_MAX_AGE: int = 3600
+    GOOGLE_JWKS_REFRESH_MARGIN: int = 600
+    GOOGLE_JWKS_MIN_REFRESH_INTERVAL: int = 60
     JWT_SECRET: Optional[str] = None
+    JWT_ACCESS_TOKEN_EXPIRE_SECONDS: int = 3600
+    JWT_REFRESH_TOKEN_EXPIRE_SECONDS: int = 30 * 24 * 3600
+    JWT_REFRESH_GRACE_SECONDS: int = 10
+    OTP_TTL_SECONDS: int = 300
+    OTP_MAX_ATTEMPTS: int = 5
+    OTP_RESEND_COOLDOWN_SECONDS: int = 60
+    OTP_HOURLY_SEND_LIMIT: int = 5
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 900
+    LOGIN_THROTTLE_FREE_ATTEMPTS: int = 3
+    LOGIN_THROTTLE_BASE_DELAY: float = 1.0
+    LOGIN_THROTTLE_MAX_DELAY: float = 60.0
+    LOGIN_THROTTLE_EMAIL_LOCKOUT: int = 10
+    LOGIN_THROTTLE_IP_FREE_ATTEMPTS: int = 30
+    LOGIN_THROTTLE_IP_LOCKOUT: int = 100
+    LOGIN_THROTTLE_TRUSTED_PROXIES: Optional[str] = None
+    JWT_CACHE_SIZE: int = 4096
+    AUTH_STATELESS: bool = True
+    AUTH_USER_CACHE_TTL: float = 30.0
     ALLOWED_ORIGINS: Optional[str] = None
     MAIL_USER_NAME: Optional[str] = None
     MAIL_PASSWORD: Optional[SecretStr] = None
@@ -31,12 +57,50 @@ class Settings(BaseSettings):
     CLOUDINARY_API_SECRET: Optional[str] = None
     MAIL_PORT: Optional[int] = None
     MAIL_SERVER: Optional[str] = None
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    SMTP_POOL_SIZE: int = 2
+    SMTP_POOL_IDLE_TIMEOUT: float = 60.0
+    SMTP_POOL_MAX_MESSAGES: int = 100
     ONESIGNAL_APP_ID: Optional[str] = None
     ONESIGNAL_API_KEY: Optional[str] = None
     ONESIGNAL_OTP_TEMPLATE_ID: Optional[str] = None
+    ONESIGNAL_TIMEOUT: float = 10.0
+    ONESIGNAL_CONNECT_TIMEOUT: float = 3.0
+    ONESIGNAL_MAX_RETRIES: int = 2
+    ONESIGNAL_RETRY_BACKOFF: float = 0.5
     N8N_API_URL: Optional[str] = None
+    N8N_DESCRIPTION_STREAM_PATH: str = "/webhook/generate-description-stream"
+    N8N_MAX_CONNECTIONS: int = 20
+    N8N_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    N8N_KEEPALIVE_EXPIRY: float = 30.0
+    N8N_CONNECT_TIMEOUT: float = 5.0
+    N8N_READ_TIMEOUT: float = 20.0
+    N8N_HTTP2: bool = True
+    N8N_MAX_CONCURRENT_REQUESTS: int = 10
+    N8N_BULKHEAD_MAX_WAIT: float = 0.5
+    N8N_BREAKER_FAILURE_THRESHOLD: int = 5
+    N8N_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+    DESCRIPTION_CACHE_TTL: int = 86400
+    DESCRIPTION_SINGLEFLIGHT_LOCK_TTL: int = 30
+    DESCRIPTION_SINGLEFLIGHT_WAIT_TIMEOUT: float = 25.0
     GOOGLE_DRIVE_FOLDER_ID: Optional[str] = None
     GOOGLE_SERVICE_ACCOUNT_FILE: Optional[str] = None
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_POLL_INTERVAL_SECONDS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_ATTEMPTS: int = 6
+    OUTBOX_BACKOFF_SECONDS: float = 10.0
+    OUTBOX_MAX_BACKOFF_SECONDS: float = 1800.0
+    OUTBOX_LEASE_SECONDS: int = 120
+    OUTBOX_RETENTION_HOURS: int = 72
+    ASSET_GC_ENABLED: bool = True
+    ASSET_GC_DRY_RUN: bool = True
+    ASSET_GC_INTERVAL_HOURS: int = 24
+    ASSET_GC_GRACE_HOURS: int = 24
+    ASSET_GC_BATCH_SIZE: int = 100
+    ASSET_GC_BATCH_INTERVAL_SECONDS: float = 1.0
 
     def is_production(self) -> bool:
         env = self.ENVIRONTMENT.lower()
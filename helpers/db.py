@@ -71,6 +71,7 @@ async def init_models():
 
         from models.users import User
         from models.reports import ReportCategory, Report, ReportImage
+        from models.notification_outbox import NotificationOutbox
 
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
@@ -1,8 +1,25 @@
 # buatkan fungsi untuk mengambil client_id, client_secret,redirect_uri dari .env
+import asyncio
+import json
 import logging
 import os
+import random
+import time
+from typing import Any, Dict, Optional
 
-from fastapi import Request
+import aiohttp
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+
+from helpers.aiohttp import SingletonAiohttp
+from helpers.config import settings
+from helpers.google_jwks import JwksUnavailable, google_jwks
+from helpers.metrics import metrics
+
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo"
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 
 class GoogleAuth:
@@ -37,3 +54,128 @@ class GoogleAuth:
     @staticmethod
     def get_frontend_uri():
         return GoogleAuth.FRONTEND_URL
+
+
+class GoogleOAuthClient:
+    """
+    Async Google OAuth client on the app-lifetime aiohttp session, so the
+    callback does not block the event loop on Google's endpoints.
+    Connection errors, timeouts, 429 and 5xx are retried with backoff.
+    """
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        delay = settings.GOOGLE_RETRY_BACKOFF * (2 ** (attempt - 1))
+        return delay + random.uniform(0, delay / 2)
+
+    @classmethod
+    async def _request(cls, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        client = SingletonAiohttp.get_aiohttp_client()
+        timeout = aiohttp.ClientTimeout(
+            total=settings.GOOGLE_TIMEOUT,
+            connect=settings.GOOGLE_CONNECT_TIMEOUT,
+        )
+        status, body = None, ""
+        last_error: Optional[str] = None
+
+        for attempt in range(1, settings.GOOGLE_MAX_RETRIES + 2):
+            started = time.perf_counter()
+            try:
+                async with client.request(
+                    method, url, timeout=timeout, **kwargs
+                ) as response:
+                    body = await response.text()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = None, ""
+                last_error = f"{type(e).__name__}: {e}"
+            finally:
+                metrics.observe(
+                    "google_oauth_request_seconds", time.perf_counter() - started
+                )
+
+            if status == 200:
+                try:
+                    return json.loads(body)
+                except ValueError:
+                    raise HTTPException(
+                        status_code=502, detail="Invalid response from Google"
+                    )
+
+            if status is not None:
+                last_error = f"{status} - {body}"
+                if status not in RETRY_STATUSES:
+                    break
+
+            if attempt <= settings.GOOGLE_MAX_RETRIES:
+                metrics.inc("google_oauth_retries")
+                logging.warning(
+                    f"Google request failed ({last_error}), retry {attempt}"
+                )
+                await asyncio.sleep(cls._backoff(attempt))
+
+        metrics.inc("google_oauth_requests_failed")
+        raise HTTPException(
+            status_code=status if status and status < 500 else 502,
+            detail=f"Google request failed: {last_error}",
+        )
+
+    @classmethod
+    async def exchange_code(cls, code: str, redirect_uri: str) -> Dict[str, Any]:
+        """
+        Exchange an authorization code for Google's access and id tokens
+        """
+        data = {
+            "code": code,
+            "client_id": GoogleAuth.get_client_id(),
+            "client_secret": GoogleAuth.get_client_secret(),
+            "redirect_uri": redirect_uri,
+            "grant_type": "authorization_code",
+        }
+        return await cls._request("POST", GOOGLE_TOKEN_URL, data=data)
+
+    @classmethod
+    async def get_userinfo(cls, access_token: str) -> Dict[str, Any]:
+        return await cls._request(
+            "GET",
+            GOOGLE_USERINFO_URL,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+    @staticmethod
+    async def userinfo_from_id_token(
+        id_token: str, access_token: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Identity from the id_token returned by the code exchange, verified
+        locally against Google's cached signing keys. Returns None when it
+        cannot be verified so the caller can fall back to userinfo.
+        """
+        try:
+            header = jwt.get_unverified_header(id_token)
+            key = await google_jwks.get_key(header.get("kid"))
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=["RS256"],
+                audience=GoogleAuth.get_client_id(),
+                issuer=GOOGLE_ISSUERS,
+                access_token=access_token,
+            )
+        except (JWTError, JwksUnavailable) as e:
+            logging.warning(f"Google id_token rejected, falling back to userinfo: {e}")
+            return None
+
+        if not claims.get("email"):
+            return None
+
+        # same shape as the userinfo endpoint
+        return {
+            "id": claims.get("sub"),
+            "email": claims.get("email"),
+            "verified_email": claims.get("email_verified", False),
+            "name": claims.get("name"),
+            "given_name": claims.get("given_name"),
+            "family_name": claims.get("family_name"),
+            "picture": claims.get("picture"),
+        }
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from typing import Dict, Optional
+
+import aiohttp
+import redis.exceptions
+
+from helpers.aiohttp import SingletonAiohttp
+from helpers.config import settings
+from helpers.metrics import metrics
+from helpers.redis import redis_client
+
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+JWKS_REDIS_KEY = "google:jwks"
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+class JwksUnavailable(Exception):
+    pass
+
+
+FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, JwksUnavailable, ValueError)
+
+
+def parse_max_age(cache_control: Optional[str]) -> int:
+    match = MAX_AGE_PATTERN.search(cache_control or "")
+    if not match:
+        return settings.GOOGLE_JWKS_DEFAULT_MAX_AGE
+    return int(match.group(1))
+
+
+class JwksCache:
+    """
+    Signing keys of an OpenID provider, cached in-process and in Redis for as
+    long as the provider's Cache-Control max-age allows, so verifying an
+    id_token does not cost a request. Workers share the Redis copy, an
+    unknown key id forces a refetch in case the provider rotated early.
+    """
+
+    def __init__(self, url: str, redis_key: str):
+        self.url = url
+        self.redis_key = redis_key
+        self._keys: Dict[str, dict] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._lock = asyncio.Lock()
+
+    def expires_in(self) -> float:
+        return self._expires_at - time.time()
+
+    def _fresh(self, min_ttl: float = 0) -> bool:
+        return bool(self._keys) and self.expires_in() > min_ttl
+
+    def _store(self, jwks: dict, expires_at: float) -> None:
+        self._keys = {key["kid"]: key for key in jwks.get("keys", []) if key.get("kid")}
+        self._expires_at = expires_at
+
+    async def _load_from_redis(self, min_ttl: float) -> bool:
+        try:
+            cached = await redis_client.get(self.redis_key)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Failed to read JWKS from Redis: {e}")
+            return False
+        if not cached:
+            return False
+        entry = json.loads(cached)
+        if entry["expires_at"] - time.time() <= min_ttl:
+            return False
+        self._store(entry["jwks"], entry["expires_at"])
+        return True
+
+    async def _fetch(self) -> None:
+        client = SingletonAiohttp.get_aiohttp_client()
+        timeout = aiohttp.ClientTimeout(
+            total=settings.GOOGLE_TIMEOUT, connect=settings.GOOGLE_CONNECT_TIMEOUT
+        )
+        self._last_fetch = time.time()
+        async with client.get(self.url, timeout=timeout) as response:
+            if response.status != 200:
+                raise JwksUnavailable(f"JWKS request failed: {response.status}")
+            jwks = json.loads(await response.text())
+            max_age = parse_max_age(response.headers.get("Cache-Control"))
+
+        metrics.inc("google_jwks_fetches")
+        expires_at = time.time() + max_age
+        self._store(jwks, expires_at)
+        try:
+            await redis_client.set(
+                self.redis_key,
+                json.dumps({"jwks": jwks, "expires_at": expires_at}),
+                ex=max_age,
+            )
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Failed to cache JWKS in Redis: {e}")
+
+    async def refresh(self, force: bool = False, min_ttl: float = 0) -> None:
+        """
+        Make sure the keys stay valid for at least `min_ttl` seconds, from
+        Redis when another worker already fetched them, otherwise from the
+        provider.
+        """
+        async with self._lock:
+            if not force and self._fresh(min_ttl):
+                return
+            if not force and await self._load_from_redis(min_ttl):
+                return
+            await self._fetch()
+
+    async def get_key(self, kid: Optional[str]) -> dict:
+        if not self._fresh():
+            try:
+                await self.refresh()
+            except FETCH_ERRORS as e:
+                if not self._keys:
+                    raise JwksUnavailable(f"JWKS unavailable: {e}")
+                # Google rotates keys days apart, expired keys are still good
+                logging.warning(f"JWKS refresh failed, using cached keys: {e}")
+
+        key = self._keys.get(kid)
+        if (
+            key is None
+            and time.time() - self._last_fetch
+            > settings.GOOGLE_JWKS_MIN_REFRESH_INTERVAL
+        ):
+            try:
+                await self.refresh(force=True)
+            except FETCH_ERRORS as e:
+                logging.warning(f"JWKS refresh failed: {e}")
+            key = self._keys.get(kid)
+        if key is None:
+            raise JwksUnavailable(f"Unknown signing key: {kid}")
+        return key
+
+    def stats(self) -> dict:
+        return {"keys": len(self._keys), "expires_in": round(self.expires_in())}
+
+
+google_jwks = JwksCache(GOOGLE_JWKS_URL, JWKS_REDIS_KEY)
+metrics.register_gauge("google_jwks", google_jwks.stats)
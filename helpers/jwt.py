@@ -1,9 +1,108 @@
 from datetime import datetime, timedelta, timezone
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
 from fastapi import HTTPException
 from jose import JWTError, jwt
 from helpers.config import settings
+from helpers.metrics import metrics
+from permissions.roles import PERMISSION_BITS_VERSION, get_role_mask
+
+REFRESH_TOKEN_TYPE = "refresh"
+
+# compact access token claim -> name used by the rest of the code
+COMPACT_CLAIMS = {
+    "rl": "role",
+    "vf": "is_verified",
+    "pm": "permissions",
+    "pv": "permissions_version",
+}
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token claims keyed by a digest of the token,
+    so a bearer token is HMAC-verified and parsed once instead of on every
+    request. Entries are dropped once the token's `exp` has passed.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str, secret_key: str) -> bytes:
+        return hashlib.sha256(f"{secret_key}\0{token}".encode()).digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: bytes, claims: dict) -> None:
+        exp = claims.get("exp")
+        if self.max_size <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[key] = (exp, claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size}
+
+
+token_cache = TokenCache(settings.JWT_CACHE_SIZE)
+metrics.register_gauge("jwt_token_cache", token_cache.stats)
+
+
+def normalize_claims(claims: dict) -> dict:
+    """
+    Expand compact claims to their long names, tokens issued before the
+    compact format (role, is_verified, profile claims) pass through unchanged.
+    """
+    normalized = dict(claims)
+    for short, name in COMPACT_CLAIMS.items():
+        if short in normalized:
+            normalized[name] = normalized.pop(short)
+    normalized.setdefault("is_verified", False)
+    if normalized.get("permissions_version") != PERMISSION_BITS_VERSION:
+        # legacy token or the permission bits changed since it was signed
+        normalized["permissions"] = get_role_mask(normalized.get("role"))
+    return normalized
+
+
+def decode_token(token: str, secret_key: str) -> dict:
+    """
+    Verify an HS256 token, serving repeated tokens from the LRU cache.
+    Claims are returned with their long names whatever the token format.
+    """
+    key = TokenCache.key(token, secret_key)
+    claims = token_cache.get(key)
+    if claims is not None:
+        metrics.inc("jwt_cache_hits")
+        return dict(claims)
+
+    metrics.inc("jwt_cache_misses")
+    claims = normalize_claims(jwt.decode(token, secret_key, algorithms=["HS256"]))
+    token_cache.set(key, claims)
+    return dict(claims)
 
 
 class JwtHelper:
@@ -18,22 +117,41 @@ class JwtHelper:
         return jwt.encode(payload, self.secret_key or "", algorithm="HS256")
 
     def decode(self, token: str) -> dict:
-        return jwt.decode(token, self.secret_key or "", algorithms=["HS256"])
+        """
+        Decode an access token, refresh tokens are only good for /auth/refresh
+        """
+        claims = decode_token(token, self.secret_key or "")
+        if claims.get("typ") == REFRESH_TOKEN_TYPE:
+            raise JWTError("Refresh token used as access token")
+        return claims
+
+    def decode_refresh_token(self, token: str) -> dict:
+        claims = decode_token(token, self.secret_key or "")
+        if claims.get("typ") != REFRESH_TOKEN_TYPE:
+            raise JWTError("Not a refresh token")
+        return claims
 
     def create_token(self, user_data: dict) -> str:
         """
         Create JWT token with user data
         """
         try:
-            logging.info(f"Creating token for user: {user_data}")
+            logging.info(f"Creating token for user: {user_data.get('id')}")
+            issued_at = datetime.now(timezone.utc)
+            role = user_data.get("role")
+            # profile data is served by /auth/me, the token only carries
+            # what authorization needs
             payload = {
                 "sub": user_data.get("id"),
-                "email": user_data.get("email"),
-                "name": user_data.get("name"),
-                "image_url": user_data.get("image_url"),
-                "is_verified": user_data.get("is_verified", False),
-                "role": user_data.get("role"),
-                "exp": datetime.now(timezone.utc) + timedelta(hours=1),
+                "rl": role,
+                "vf": bool(user_data.get("is_verified", False)),
+                "pm": get_role_mask(role),
+                "pv": PERMISSION_BITS_VERSION,
+                # milliseconds, a revocation must not miss tokens issued
+                # earlier in the same second
+                "iat": round(issued_at.timestamp(), 3),
+                "exp": issued_at
+                + timedelta(seconds=settings.JWT_ACCESS_TOKEN_EXPIRE_SECONDS),
             }
             access_token = self.encode(payload)
             return access_token
@@ -42,19 +160,21 @@ class JwtHelper:
                 status_code=500, detail=f"Failed to create token: {str(e)}"
             )
 
-    def create_refresh_token(self, user_data: dict) -> str:
+    def create_refresh_token(self, user_id: str, family_id: str, token_id: str) -> str:
         """
-        Create JWT refresh token with user data
+        Create a rotating refresh token, `fam` identifies the login session
+        and `jti` the current link of its rotation chain
         """
         try:
+            issued_at = datetime.now(timezone.utc)
             payload = {
-                "sub": user_data.get("id"),
-                "email": user_data.get("email"),
-                "name": user_data.get("name"),
-                "picture": user_data.get("picture"),
-                "phone": user_data.get("phone"),
-                "address": user_data.get("address"),
-                "exp": datetime.now(timezone.utc) + timedelta(days=30),
+                "sub": user_id,
+                "typ": REFRESH_TOKEN_TYPE,
+                "fam": family_id,
+                "jti": token_id,
+                "iat": issued_at,
+                "exp": issued_at
+                + timedelta(seconds=settings.JWT_REFRESH_TOKEN_EXPIRE_SECONDS),
             }
             refresh_token = self.encode(payload)
             return refresh_token
@@ -1,5 +1,7 @@
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
+from email.message import Message
 from pathlib import Path
+from typing import List, Optional
 from dotenv import load_dotenv
 import os
 import logging
@@ -7,18 +9,38 @@ from fastapi_mail.errors import ConnectionErrors
 from pydantic import EmailStr, SecretStr
 import random
 import redis.asyncio as redis
-import requests
 from helpers.config import settings
-from jinja2 import Template
-from helpers.redis import set_redis_value, get_redis_value, delete_redis_value
+from helpers.metrics import metrics
+from helpers.smtp import SmtpConnectionPool
+from helpers.onesignal import EmailMessage, OneSignalClient, OneSignalError
+from jinja2 import Environment, FileSystemLoader
+from helpers.redis import store_otp
 
 load_dotenv()
 
 
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+# Templates are compiled once per process and kept in the environment cache,
+# in development they are recompiled when the file changes on disk.
+template_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    auto_reload=settings.is_development(),
+    cache_size=-1,
+)
+
+
+def warm_template_cache() -> None:
+    """
+    Compile every email template at startup so the first email does not pay for it
+    """
+    for template_name in template_env.list_templates(extensions=["html"]):
+        template_env.get_template(template_name)
+    logging.info(f"Email templates compiled: {len(template_env.cache or {})}")
+
+
 def render_otp_template(otp_code: str) -> str:
-    with open("templates/otp_email.html", "r") as file:
-        template = Template(file.read())
-        return template.render(otp_code=otp_code)
+    return render_template("otp_email.html", otp_code=otp_code)
 
 
 def render_status_report_template(
@@ -28,15 +50,14 @@ def render_status_report_template(
     updated_at: str,
     feedback: str,
 ) -> str:
-    with open("templates/status_report_email.html", "r") as file:
-        template = Template(file.read())
-        return template.render(
-            report_id=report_id,
-            category_name=category_name,
-            status=status,
-            updated_at=updated_at,
-            feedback=feedback,
-        )
+    return render_template(
+        "status_report_email.html",
+        report_id=report_id,
+        category_name=category_name,
+        status=status,
+        updated_at=updated_at,
+        feedback=feedback,
+    )
 
 
 def render_template(template_name: str, **kwargs) -> str:
@@ -50,10 +71,7 @@ def render_template(template_name: str, **kwargs) -> str:
     Returns:
         str: The rendered HTML content.
     """
-    template_path = Path(__file__).parent.parent / "templates" / template_name
-    with open(template_path, "r") as file:
-        template = Template(file.read())
-        return template.render(**kwargs)
+    return template_env.get_template(template_name).render(**kwargs)
 
 
 config = ConnectionConfig(
@@ -66,24 +84,54 @@ config = ConnectionConfig(
     MAIL_SSL_TLS=False,
     USE_CREDENTIALS=True,
     VALIDATE_CERTS=False,
-    TEMPLATE_FOLDER=Path(__file__).parent.parent / "templates/",
+    TEMPLATE_FOLDER=TEMPLATES_DIR,
 )
 
 
-async def send_otp_email_async(email_to: EmailStr, user_id: str) -> bool:
-    otp_code = str(random.randint(100000, 999999))
-    redis_key = f"otp:{user_id}"
-    await set_redis_value(redis_key, otp_code, ex=300)  # Set OTP with 5 minutes expiry
+smtp_pool = SmtpConnectionPool(
+    config,
+    size=settings.SMTP_POOL_SIZE,
+    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+    max_messages=settings.SMTP_POOL_MAX_MESSAGES,
+)
+metrics.register_gauge("smtp_pool", smtp_pool.stats)
+
+
+async def build_smtp_message(
+    subject: str, email_to: EmailStr, template: str, body: dict
+) -> Message:
+    """
+    Render with the shared template environment and build the MIME message
+    """
     message = MessageSchema(
-        subject="Your OTP Code",
+        subject=subject,
         recipients=[email_to],
-        template_body={"code": otp_code},
+        body=render_template(template, **body),
         subtype=MessageType.html,
     )
+    return await FastMail(config).get_message(message)
+
+
+async def send_emails_async(messages: List[Message]) -> List[Optional[str]]:
+    """
+    Send a queue of prepared messages over one pooled SMTP session.
+    Returns the error per message, None when it was sent.
+    """
+    return await smtp_pool.send_messages(messages)
+
+
+async def send_otp_email_async(email_to: EmailStr, user_id: str) -> bool:
+    otp_code = str(random.randint(100000, 999999))
+    await store_otp(user_id, otp_code)
 
-    fm = FastMail(config)
     try:
-        await fm.send_message(message, template_name="otp_email.html")
+        message = await build_smtp_message(
+            "Your OTP Code", email_to, "otp_email.html", {"otp_code": otp_code}
+        )
+        [error] = await send_emails_async([message])
+        if error:
+            logging.error(f"Failed to send OTP email: {error}")
+            return False
         logging.info(f"OTP email sent to {email_to}")
         return True
     except Exception as e:
@@ -96,16 +144,12 @@ async def send_email_async(subject: str, email_to: EmailStr, body: dict, templat
         logging.error("Email configuration is not initialized")
         return False
 
-    message = MessageSchema(
-        subject=subject,
-        recipients=[email_to],
-        template_body=body,
-        subtype=MessageType.html,
-    )
-
-    fm = FastMail(config)
     try:
-        await fm.send_message(message, template_name=template)
+        message = await build_smtp_message(subject, email_to, template, body)
+        [error] = await send_emails_async([message])
+        if error:
+            logging.error(f"Failed to send email: {error}")
+            return False
         logging.info(f"Email sent successfully to {email_to}")
         return True
     except ConnectionErrors as e:
@@ -116,6 +160,36 @@ async def send_email_async(subject: str, email_to: EmailStr, body: dict, templat
         return False
 
 
+async def build_otp_email(email_to: EmailStr, user_id: str) -> EmailMessage:
+    """
+    Generate and store a new OTP for the user and render its email
+    """
+    otp = str(random.randint(100000, 999999))
+    await store_otp(user_id, otp)
+    return EmailMessage(email_to, "Kode OTP Anda", render_otp_template(otp))
+
+
+def build_status_report_email(
+    email_to: EmailStr,
+    report_id: str,
+    category_name: str,
+    status: str,
+    updated_at: str,
+    feedback: str,
+) -> EmailMessage:
+    return EmailMessage(
+        email_to,
+        f"Laporan {report_id} telah diperbarui",
+        render_status_report_template(
+            report_id=report_id,
+            category_name=category_name,
+            status=status,
+            updated_at=updated_at,
+            feedback=feedback,
+        ),
+    )
+
+
 async def send_otp_email(email_to: EmailStr, user_id: str):
     """
     Send OTP email
@@ -127,32 +201,16 @@ async def send_otp_email(email_to: EmailStr, user_id: str):
     Returns:
         bool: True if email sent successfully, False otherwise
     """
-
-    otp = str(random.randint(100000, 999999))
-
-    url = "https://onesignal.com/api/v1/notifications"
-    headers = {
-        "Authorization": "Basic " + (settings.ONESIGNAL_API_KEY or ""),
-        "Content-Type": "application/json",
-    }
-    otp_html_content = render_otp_template(otp)
-
-    payload = {
-        "app_id": settings.ONESIGNAL_APP_ID,
-        "include_email_tokens": [email_to],
-        "email_subject": "Kode OTP Anda",
-        "email_body": otp_html_content,
-    }
     try:
-        await set_redis_value(f"otp:{user_id}", otp, ex=300)
-
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            logging.info(f"OTP email sent successfully to {email_to}")
-            return True
-        else:
-            logging.error(f"Failed to send OTP email: {response.text}")
-            return False
+        message = await build_otp_email(email_to, user_id)
+        await OneSignalClient.send_email(
+            [message.email_to], message.subject, message.html_body
+        )
+        logging.info(f"OTP email sent successfully to {email_to}")
+        return True
+    except OneSignalError as e:
+        logging.error(f"Failed to send OTP email: {e}")
+        return False
     except Exception as e:
         logging.error(f"Error sending OTP email: {e}")
         return False
@@ -169,33 +227,23 @@ async def send_status_report_email(
     """
     Send status report email
     """
-    url = "https://onesignal.com/api/v1/notifications"
-    headers = {
-        "Authorization": "Basic " + (settings.ONESIGNAL_API_KEY or ""),
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "app_id": settings.ONESIGNAL_APP_ID,
-        "include_email_tokens": [email_to],
-        "email_subject": f"Laporan {report_id} telah diperbarui",
-        "email_body": render_status_report_template(
+    try:
+        message = build_status_report_email(
+            email_to=email_to,
             report_id=report_id,
             category_name=category_name,
             status=status,
             updated_at=updated_at,
             feedback=feedback,
-        ),
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            logging.info(f"Status report email sent successfully to {email_to}")
-            return True
-        else:
-            logging.error(f"Failed to send status report email: {response.text}")
-            return False
+        )
+        await OneSignalClient.send_email(
+            [message.email_to], message.subject, message.html_body
+        )
+        logging.info(f"Status report email sent successfully to {email_to}")
+        return True
+    except OneSignalError as e:
+        logging.error(f"Failed to send status report email: {e}")
+        return False
     except Exception as e:
         logging.error(f"Error sending status report email: {e}")
         return False
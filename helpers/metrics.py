@@ -0,0 +1,64 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+    Counters are incremented by the code paths they measure, timings
+    aggregate observed durations, gauges are callables evaluated when a
+    snapshot is taken (e.g. pool statistics).
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        return self._counters.get(name, 0.0)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def register_gauge(self, name: str, func: Callable[[], Any]) -> None:
+        self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {
+                name: {
+                    **timing,
+                    "avg": (
+                        timing["total"] / timing["count"] if timing["count"] else 0.0
+                    ),
+                }
+                for name, timing in self._timings.items()
+            }
+
+        gauges = {}
+        for name, func in self._gauges.items():
+            try:
+                gauges[name] = func()
+            except Exception as e:
+                logging.error(f"Error reading gauge {name}: {e}")
+                gauges[name] = None
+
+        return {"counters": counters, "timings": timings, "gauges": gauges}
+
+
+metrics = Metrics()
@@ -0,0 +1,94 @@
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from helpers.circuit_breaker import Bulkhead, CircuitBreaker
+from helpers.config import settings
+from helpers.metrics import metrics
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class SingletonN8nClient:
+    """
+    App-lifetime httpx client for n8n webhooks.
+    Keeps connections alive between requests so each call skips the TCP/TLS handshake.
+    """
+
+    client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        if cls.client is None:
+            limits = httpx.Limits(
+                max_connections=settings.N8N_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.N8N_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.N8N_KEEPALIVE_EXPIRY,
+            )
+            timeout = httpx.Timeout(
+                settings.N8N_READ_TIMEOUT,
+                connect=settings.N8N_CONNECT_TIMEOUT,
+            )
+            http2 = settings.N8N_HTTP2 and HTTP2_AVAILABLE
+            cls.client = httpx.AsyncClient(
+                base_url=settings.N8N_API_URL or "",
+                limits=limits,
+                timeout=timeout,
+                http2=http2,
+            )
+            logging.info(f"n8n HTTP client created (http2={http2})")
+
+        return cls.client
+
+    @classmethod
+    async def close_client(cls) -> None:
+        if cls.client:
+            await cls.client.aclose()
+            cls.client = None
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Any]:
+        """
+        Connection pool statistics for the metrics endpoint. They come from
+        httpx internals, empty when an httpx release changes them.
+        """
+        if cls.client is None:
+            return {"open": 0, "idle": 0, "active": 0, "waiting": 0}
+
+        try:
+            pool = cls.client._transport._pool
+            connections = list(pool.connections)
+            requests = list(pool._requests)
+            idle = sum(1 for connection in connections if connection.is_idle())
+            waiting = sum(1 for request in requests if request.is_queued())
+        except AttributeError:
+            return {}
+        return {
+            "open": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+            "waiting": waiting,
+            "max_connections": settings.N8N_MAX_CONNECTIONS,
+        }
+
+
+n8n_breaker = CircuitBreaker(
+    name="n8n",
+    failure_threshold=settings.N8N_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.N8N_BREAKER_RECOVERY_TIMEOUT,
+)
+n8n_bulkhead = Bulkhead(
+    name="n8n",
+    max_concurrent=settings.N8N_MAX_CONCURRENT_REQUESTS,
+    max_wait=settings.N8N_BULKHEAD_MAX_WAIT,
+)
+
+metrics.register_gauge("n8n_pool", SingletonN8nClient.pool_stats)
+metrics.register_gauge("n8n_circuit_breaker", n8n_breaker.stats)
+metrics.register_gauge("n8n_bulkhead", n8n_bulkhead.stats)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from helpers.aiohttp import SingletonAiohttp
+from helpers.config import settings
+from helpers.metrics import metrics
+
+ONESIGNAL_NOTIFICATIONS_URL = "https://onesignal.com/api/v1/notifications"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OneSignalError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class EmailMessage:
+    email_to: str
+    subject: str
+    html_body: str
+
+
+class OneSignalClient:
+    """
+    Async OneSignal client on the app-lifetime aiohttp session.
+    Transient failures (timeouts, connection errors, 429 and 5xx) are retried
+    with exponential backoff, every attempt is timed in the metrics registry.
+    """
+
+    @staticmethod
+    def _headers() -> Dict[str, str]:
+        return {
+            "Authorization": "Basic " + (settings.ONESIGNAL_API_KEY or ""),
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        delay = settings.ONESIGNAL_RETRY_BACKOFF * (2 ** (attempt - 1))
+        return delay + random.uniform(0, delay / 2)
+
+    @classmethod
+    async def _post(cls, payload: dict) -> Dict[str, Any]:
+        client = SingletonAiohttp.get_aiohttp_client()
+        timeout = aiohttp.ClientTimeout(
+            total=settings.ONESIGNAL_TIMEOUT,
+            connect=settings.ONESIGNAL_CONNECT_TIMEOUT,
+        )
+        last_error: Optional[str] = None
+
+        for attempt in range(1, settings.ONESIGNAL_MAX_RETRIES + 2):
+            started = time.perf_counter()
+            try:
+                async with client.post(
+                    ONESIGNAL_NOTIFICATIONS_URL,
+                    headers=cls._headers(),
+                    json=payload,
+                    timeout=timeout,
+                ) as response:
+                    body = await response.text()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, body = None, ""
+                last_error = f"{type(e).__name__}: {e}"
+            finally:
+                metrics.observe(
+                    "onesignal_request_seconds", time.perf_counter() - started
+                )
+
+            if status == 200:
+                metrics.inc("onesignal_requests_succeeded")
+                return cls._json(body)
+
+            if status is not None:
+                last_error = f"{status} - {body}"
+                if status not in RETRY_STATUSES:
+                    break
+
+            if attempt <= settings.ONESIGNAL_MAX_RETRIES:
+                metrics.inc("onesignal_retries")
+                logging.warning(
+                    f"OneSignal request failed ({last_error}), retry {attempt}"
+                )
+                await asyncio.sleep(cls._backoff(attempt))
+
+        metrics.inc("onesignal_requests_failed")
+        raise OneSignalError(f"OneSignal request failed: {last_error}")
+
+    @staticmethod
+    def _json(body: str) -> Dict[str, Any]:
+        try:
+            return json.loads(body) if body else {}
+        except ValueError:
+            return {}
+
+    @classmethod
+    async def send_email(
+        cls,
+        email_to: List[str],
+        subject: str,
+        html_body: str,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send an email notification to the given email addresses. Every retry
+        carries the same idempotency key, so OneSignal drops the duplicate
+        when an attempt that timed out was in fact accepted.
+        """
+        payload = {
+            "app_id": settings.ONESIGNAL_APP_ID,
+            "include_email_tokens": email_to,
+            "email_subject": subject,
+            "email_body": html_body,
+            "idempotency_key": idempotency_key or str(uuid.uuid4()),
+        }
+        return await cls._post(payload)
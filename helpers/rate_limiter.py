@@ -1,9 +1,21 @@
-from fastapi import FastAPI
+import hashlib
+import ipaddress
+import logging
+import secrets
+import time
+from typing import List, Optional, Tuple, Union
+
+import redis.exceptions
+from fastapi import FastAPI, Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from throttled.fastapi import IPLimiter, TotalLimiter
 from throttled.models import Rate
 from throttled.storage.memory import MemoryStorage
 
+from helpers.config import settings
+from helpers.metrics import metrics
+from helpers.redis import redis_client
+
 
 def setup(app: FastAPI):
     memory = MemoryStorage(cache={})
@@ -12,3 +24,181 @@ def setup(app: FastAPI):
 
     app.add_middleware(BaseHTTPMiddleware, dispatch=total_limiter.dispatch)
     app.add_middleware(BaseHTTPMiddleware, dispatch=ip_limiter.dispatch)
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def _trusted_proxies() -> List[Network]:
+    return [
+        ipaddress.ip_network(proxy.strip(), strict=False)
+        for proxy in (settings.LOGIN_THROTTLE_TRUSTED_PROXIES or "").split(",")
+        if proxy.strip()
+    ]
+
+
+def _is_trusted(address: str, proxies: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in proxy for proxy in proxies)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    The address of the client behind the configured trusted proxies.
+    X-Forwarded-For is read from the right and only while the hop that
+    appended it is trusted, so a client cannot pick its own address
+    """
+    peer = request.client.host if request.client else None
+    proxies = _trusted_proxies()
+    if not peer or not _is_trusted(peer, proxies):
+        return peer
+
+    forwarded = request.headers.get("x-forwarded-for", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    address = peer
+    for hop in reversed(hops):
+        address = hop
+        if not _is_trusted(hop, proxies):
+            break
+    return address
+
+
+# Prune the window, decide from the remaining failures and reserve the
+# attempt in one server-side step. A reserved attempt counts as a failure
+# until the login succeeds, so a concurrent burst cannot all get past the
+# check before the first failure is recorded.
+RESERVE_LOGIN_ATTEMPT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local base_delay = tonumber(ARGV[3])
+local max_delay = tonumber(ARGV[4])
+local wait = 0
+local locked = 0
+for i, key in ipairs(KEYS) do
+    local free = tonumber(ARGV[4 + i * 2])
+    local lockout = tonumber(ARGV[5 + i * 2])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local failures = redis.call('ZRANGE', key, 0, -1, 'WITHSCORES')
+    local count = #failures / 2
+    local key_wait = 0
+    if count >= lockout then
+        -- unlocked once enough failures have aged out of the window
+        key_wait = tonumber(failures[(count - lockout) * 2 + 2]) + window - now
+        if key_wait > 0 then
+            locked = 1
+        end
+    elseif count >= free then
+        local delay = math.min(base_delay * 2 ^ (count - free), max_delay)
+        key_wait = tonumber(failures[count * 2]) + delay - now
+    end
+    if key_wait > wait then
+        wait = key_wait
+    end
+end
+if wait > 0 then
+    return {math.ceil(wait), locked}
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[5])
+    redis.call('EXPIRE', key, math.ceil(window))
+end
+return {0, 0}
+"""
+reserve_login_attempt_script = redis_client.register_script(
+    RESERVE_LOGIN_ATTEMPT_SCRIPT
+)
+
+
+class LoginThrottle:
+    """
+    Sliding windows of failed logins per account and per client IP in Redis,
+    checked before any database or bcrypt work. After a few free failures
+    each attempt has to wait twice as long as the previous one, past the
+    lockout threshold attempts are refused until failures leave the window.
+    """
+
+    def __init__(self, prefix: str = "login:fail"):
+        self.prefix = prefix
+
+    def _keys(self, email: str, ip: Optional[str]) -> List[Tuple[str, int, int]]:
+        """
+        Each window with its own free attempts and lockout threshold
+        """
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+        keys = [
+            (
+                f"{self.prefix}:email:{digest}",
+                settings.LOGIN_THROTTLE_FREE_ATTEMPTS,
+                settings.LOGIN_THROTTLE_EMAIL_LOCKOUT,
+            )
+        ]
+        if ip:
+            keys.append(
+                (
+                    f"{self.prefix}:ip:{ip}",
+                    settings.LOGIN_THROTTLE_IP_FREE_ATTEMPTS,
+                    settings.LOGIN_THROTTLE_IP_LOCKOUT,
+                )
+            )
+        return keys
+
+    async def reserve(self, email: str, ip: Optional[str]) -> Tuple[int, Optional[str]]:
+        """
+        Returns the seconds to wait and no attempt when the login is
+        throttled, otherwise 0 and the id of the reserved attempt
+        """
+        now = time.time()
+        keys = self._keys(email, ip)
+        attempt = f"{now}:{secrets.token_hex(4)}"
+        try:
+            wait, locked = await reserve_login_attempt_script(
+                keys=[key for key, _, _ in keys],
+                args=[
+                    now,
+                    settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+                    settings.LOGIN_THROTTLE_BASE_DELAY,
+                    settings.LOGIN_THROTTLE_MAX_DELAY,
+                    attempt,
+                    *[limit for _, free, lockout in keys for limit in (free, lockout)],
+                ],
+            )
+        except redis.exceptions.RedisError as e:
+            # throttling is a safeguard, do not block logins when Redis is down
+            logging.warning(f"Login throttle check failed: {e}")
+            return 0, None
+
+        if int(wait) > 0:
+            metrics.inc("login_throttle_blocked")
+            if int(locked):
+                metrics.inc("login_throttle_lockouts")
+            return int(wait), None
+        return 0, attempt
+
+    def record_failure(self) -> None:
+        """
+        The reserved attempt already stays in the windows as the failure
+        """
+        metrics.inc("login_failures")
+
+    async def release(
+        self, email: str, ip: Optional[str], attempt: Optional[str]
+    ) -> None:
+        """
+        A successful login clears the account's failures and takes its own
+        attempt back from the IP window, earlier failures of the IP stay
+        """
+        keys = self._keys(email, ip)
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(keys[0][0])
+                if attempt and len(keys) > 1:
+                    pipe.zrem(keys[1][0], attempt)
+                await pipe.execute()
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Failed to reset login throttle: {e}")
+
+
+login_throttle = LoginThrottle()
@@ -1,3 +1,4 @@
+from typing import Tuple
 from fastapi import HTTPException
 import redis.asyncio as redisasync
 import redis.exceptions
@@ -54,3 +55,150 @@ async def delete_redis_value(key: str) -> bool:
         return True
     except redis.exceptions.RedisError as e:
         raise HTTPException(status_code=500, detail=f"Redis error: {str(e)}")
+
+
+def oauth_state_key(state: str) -> str:
+    return f"oauth_state:{state}"
+
+
+async def store_oauth_state(state: str, data: dict, ex: int = 3600) -> bool:
+    """
+    Store everything the OAuth callback needs under one hash, one round trip.
+    """
+    key = oauth_state_key(state)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=data)
+            pipe.expire(key, ex)
+            await pipe.execute()
+        return True
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {str(e)}")
+
+
+async def consume_oauth_state(state: str) -> dict:
+    """
+    Read and delete the OAuth state in one round trip, so a state can be
+    used once. Returns an empty dict for unknown or expired states.
+    """
+    key = oauth_state_key(state)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(key)
+            pipe.delete(key)
+            data, _ = await pipe.execute()
+        return data
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {str(e)}")
+
+
+OTP_VALID = 1
+OTP_INVALID = 0
+OTP_EXPIRED = -1
+OTP_LOCKED = -2
+
+# Compare, count the failed attempt and consume in one server-side step, so
+# a code cannot be used twice by concurrent requests and guessing is capped.
+VERIFY_OTP_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok ~= 'hash' then
+    return -1
+end
+local stored = redis.call('HGET', KEYS[1], 'code')
+if not stored then
+    return -1
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return -2
+end
+return 0
+"""
+verify_otp_script = redis_client.register_script(VERIFY_OTP_SCRIPT)
+
+
+def otp_key(user_id: str) -> str:
+    return f"otp:{user_id}"
+
+
+async def store_otp(user_id: str, code: str, ex: int = None) -> bool:
+    """
+    Store a new OTP for the user, replacing any previous code and its attempts.
+    """
+    key = otp_key(user_id)
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={"code": code, "attempts": 0})
+            pipe.expire(key, ex or settings.OTP_TTL_SECONDS)
+            await pipe.execute()
+        return True
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {str(e)}")
+
+
+async def verify_and_consume_otp(user_id: str, code: str) -> int:
+    """
+    Check an OTP atomically, returns OTP_VALID (and deletes the code),
+    OTP_INVALID, OTP_EXPIRED or OTP_LOCKED after OTP_MAX_ATTEMPTS failures.
+    """
+    try:
+        return int(
+            await verify_otp_script(
+                keys=[otp_key(user_id)], args=[code, settings.OTP_MAX_ATTEMPTS]
+            )
+        )
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {str(e)}")
+
+
+OTP_SEND_ALLOWED = 1
+OTP_SEND_COOLDOWN = 0
+OTP_SEND_LIMITED = -1
+
+# One send per cooldown window and a budget per hour. Inside the window the
+# caller gets the remaining lifetime of the OTP already sent instead.
+RESERVE_OTP_SEND_SCRIPT = """
+local cooldown = redis.call('TTL', KEYS[2])
+if cooldown > 0 then
+    return {0, redis.call('TTL', KEYS[1]), cooldown}
+end
+local sent = redis.call('INCR', KEYS[3])
+if sent == 1 then
+    redis.call('EXPIRE', KEYS[3], 3600)
+end
+if sent > tonumber(ARGV[2]) then
+    return {-1, redis.call('TTL', KEYS[1]), redis.call('TTL', KEYS[3])}
+end
+redis.call('SET', KEYS[2], 1, 'EX', ARGV[1])
+return {1, tonumber(ARGV[3]), tonumber(ARGV[1])}
+"""
+reserve_otp_send_script = redis_client.register_script(RESERVE_OTP_SEND_SCRIPT)
+
+
+async def reserve_otp_send(user_id: str) -> Tuple[int, int, int]:
+    """
+    Claim the right to send the user a new OTP. Returns the outcome
+    (OTP_SEND_ALLOWED, OTP_SEND_COOLDOWN or OTP_SEND_LIMITED), the seconds
+    the current OTP stays valid and the seconds until the next send.
+    """
+    try:
+        outcome, expires_in, retry_after = await reserve_otp_send_script(
+            keys=[
+                otp_key(user_id),
+                f"otp:cooldown:{user_id}",
+                f"otp:budget:{user_id}",
+            ],
+            args=[
+                settings.OTP_RESEND_COOLDOWN_SECONDS,
+                settings.OTP_HOURLY_SEND_LIMIT,
+                settings.OTP_TTL_SECONDS,
+            ],
+        )
+        return int(outcome), max(int(expires_in), 0), max(int(retry_after), 0)
+    except redis.exceptions.RedisError as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {str(e)}")
@@ -6,6 +6,7 @@ from routes.feedback_user import routes_feedback_user
 from routes.district import routes_district
 from routes.villages import routes_village
 from routes.reports import routes_report
+from routes.metrics import routes_metrics
 from helpers.config import settings
 
 
@@ -18,3 +19,4 @@ def setup(app: FastAPI):
     app.include_router(routes_feedback_user, prefix=prefix)
     app.include_router(routes_district, prefix=prefix)
     app.include_router(routes_village, prefix=prefix)
+    app.include_router(routes_metrics, prefix=prefix)
@@ -1,3 +1,4 @@
+from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -5,6 +6,8 @@ from fastapi import FastAPI
 
 executors = {
     "default": ThreadPoolExecutor(10),
+    # coroutine jobs must run on the event loop, not in the thread pool
+    "asyncio": AsyncIOExecutor(),
 }
 
 jobstores = {
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import logging
+import secrets
+from typing import Any, Awaitable, Callable, Dict, Optional
+import redis.asyncio as redisasync
+import redis.exceptions
+from helpers.metrics import metrics
+from helpers.redis import redis_client
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key so the work runs only once.
+
+    Within a worker, callers await the same task. Across workers, the leader
+    holds a Redis lock and publishes its result under a short-lived key that
+    followers poll, so they never repeat the work themselves. The result key
+    is only read by callers that found the lock taken, and only lives long
+    enough for them to poll it, it is not a cache.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        lock_ttl: int = 30,
+        wait_timeout: float = 25.0,
+        result_ttl: int = 5,
+        poll_interval: float = 0.2,
+        client: Optional[redisasync.Redis] = None,
+    ):
+        self.namespace = namespace
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.client = client or redis_client
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_distributed(key, func))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            metrics.inc(f"{self.namespace}_singleflight_local_followers")
+
+        # a cancelled caller (client disconnect) must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key, None)
+        if not task.cancelled():
+            # mark the exception as retrieved when every caller went away
+            task.exception()
+
+    async def _run_distributed(
+        self, key: str, func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        lock_key = f"{self.namespace}:lock:{key}"
+        result_key = f"{self.namespace}:result:{key}"
+        token = secrets.token_hex(8)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+
+        following = False
+        try:
+            while True:
+                if following:
+                    # checked before the lock, the leader may have just released it
+                    cached = await self.client.get(result_key)
+                    if cached is not None:
+                        metrics.inc(f"{self.namespace}_singleflight_remote_followers")
+                        return json.loads(cached)
+
+                if await self.client.set(lock_key, token, nx=True, ex=self.lock_ttl):
+                    break
+                following = True
+
+                if loop.time() >= deadline:
+                    logging.warning(
+                        f"Timed out waiting for {self.namespace} leader, calling directly"
+                    )
+                    metrics.inc(f"{self.namespace}_singleflight_wait_timeouts")
+                    return await func()
+
+                await asyncio.sleep(self.poll_interval)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Single-flight Redis error, calling directly: {e}")
+            return await func()
+
+        metrics.inc(f"{self.namespace}_singleflight_leaders")
+        try:
+            result = await func()
+            await self._publish(result_key, result)
+            return result
+        finally:
+            await self._release(lock_key, token)
+
+    async def _publish(self, result_key: str, result: Any) -> None:
+        try:
+            await self.client.set(result_key, json.dumps(result), ex=self.result_ttl)
+        except (redis.exceptions.RedisError, TypeError) as e:
+            logging.warning(f"Failed to publish single-flight result: {e}")
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            await self.client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Failed to release single-flight lock: {e}")
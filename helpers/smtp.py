@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+
+from helpers.metrics import metrics
+
+# the connection itself is broken, reconnect and carry on with the queue
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+
+class SmtpConnectionPool:
+    """
+    Keep authenticated SMTP sessions open between emails so each message
+    skips the connect, STARTTLS and login round trips.
+
+    Idle sessions are dropped after idle_timeout (servers close them anyway)
+    and recycled after max_messages, a broken session is replaced once and
+    the remaining messages are sent over the new one.
+    """
+
+    def __init__(
+        self,
+        config: ConnectionConfig,
+        size: int = 2,
+        idle_timeout: float = 60.0,
+        max_messages: int = 100,
+    ):
+        self.config = config
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self._semaphore = asyncio.Semaphore(size)
+        # (session, last used, messages sent)
+        self._idle: List[Tuple[aiosmtplib.SMTP, float, int]] = []
+        self._active = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        session = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            timeout=self.config.TIMEOUT,
+            port=self.config.MAIL_PORT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            local_hostname=self.config.LOCAL_HOSTNAME,
+            cert_bundle=self.config.CERT_BUNDLE,
+        )
+        await session.connect()
+        if self.config.USE_CREDENTIALS:
+            await session.login(
+                self.config.MAIL_USERNAME,
+                self.config.MAIL_PASSWORD.get_secret_value(),
+            )
+        metrics.inc("smtp_connections_opened")
+        return session
+
+    @staticmethod
+    async def _close(session: aiosmtplib.SMTP) -> None:
+        try:
+            if session.is_connected:
+                await session.quit()
+        except Exception:
+            session.close()
+
+    async def _checkout(self) -> Tuple[aiosmtplib.SMTP, int]:
+        now = time.monotonic()
+        while self._idle:
+            session, last_used, sent = self._idle.pop()
+            if session.is_connected and now - last_used < self.idle_timeout:
+                metrics.inc("smtp_connections_reused")
+                return session, sent
+            await self._close(session)
+        return await self._connect(), 0
+
+    def _checkin(self, session: aiosmtplib.SMTP, sent: int) -> None:
+        self._idle.append((session, time.monotonic(), sent))
+
+    @asynccontextmanager
+    async def _session(self):
+        async with self._semaphore:
+            session, sent = await self._checkout()
+            self._active += 1
+            state = {"session": session, "sent": sent}
+            try:
+                yield state
+            except BaseException:
+                await self._close(state["session"])
+                raise
+            else:
+                if state["sent"] >= self.max_messages:
+                    await self._close(state["session"])
+                else:
+                    self._checkin(state["session"], state["sent"])
+            finally:
+                self._active -= 1
+
+    async def send_messages(self, messages: List[Message]) -> List[Optional[str]]:
+        """
+        Send a queue of messages over one pooled session.
+        Returns the error of each message, None when it was accepted.
+        """
+        errors: List[Optional[str]] = [None] * len(messages)
+        if self.config.SUPPRESS_SEND or not messages:
+            return errors
+
+        position = 0
+        reconnected = False
+        while position < len(messages):
+            try:
+                async with self._session() as state:
+                    while position < len(messages):
+                        if state["sent"] >= self.max_messages:
+                            await self._close(state["session"])
+                            state["session"], state["sent"] = await self._connect(), 0
+                        try:
+                            await state["session"].send_message(messages[position])
+                        except CONNECTION_ERRORS:
+                            raise
+                        except aiosmtplib.SMTPException as e:
+                            # refused recipient or sender, the session is still usable
+                            errors[position] = str(e)
+                        state["sent"] += 1
+                        position += 1
+                        reconnected = False
+            except CONNECTION_ERRORS as e:
+                if reconnected:
+                    logging.error(f"SMTP connection failed again, giving up: {e}")
+                    for i in range(position, len(messages)):
+                        errors[i] = str(e)
+                    break
+                logging.warning(f"SMTP connection lost, reconnecting: {e}")
+                metrics.inc("smtp_reconnects")
+                reconnected = True
+
+        metrics.inc("smtp_messages_sent", sum(1 for error in errors if error is None))
+        return errors
+
+    async def close(self) -> None:
+        while self._idle:
+            session, _, _ = self._idle.pop()
+            await self._close(session)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"idle": len(self._idle), "active": self._active, "size": self.size}
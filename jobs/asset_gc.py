@@ -0,0 +1,201 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from sqlalchemy.future import select
+
+from helpers.cloudinary import (
+    DELETE_RESOURCES_LIMIT,
+    delete_images,
+    list_images,
+    public_id_from_url,
+)
+from helpers.config import settings
+from helpers.db import db_connection
+from helpers.redis import redis_client
+from helpers.scheduler import scheduler
+from models.feedback_user import FeedbackUser
+from models.reports import Report, ReportImage
+from models.users import User
+from services.reports import DRIVE_BATCH_LIMIT, ReportService
+
+# Folders written by upload_image: report attachments and profile pictures
+CLOUDINARY_FOLDERS = ["reports/images", "uploads"]
+LOCK_KEY = "asset_gc:lock"
+
+
+def drive_file_id_from_url(url: Optional[str]) -> Optional[str]:
+    """
+    Extract the Google Drive file id from a webContentLink / webViewLink
+    """
+    if not url or "drive.google.com" not in url:
+        return None
+    parsed = urlparse(url)
+    file_id = parse_qs(parsed.query).get("id")
+    if file_id:
+        return file_id[0]
+    # https://drive.google.com/file/d/<id>/view
+    parts = parsed.path.split("/")
+    if "d" in parts and parts.index("d") + 1 < len(parts):
+        return parts[parts.index("d") + 1]
+    return None
+
+
+def parse_created_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def find_orphans(
+    assets: Iterable[Dict[str, Any]],
+    referenced: Set[str],
+    cutoff: datetime,
+    id_field: str,
+    created_field: str,
+) -> List[str]:
+    """
+    Return ids of assets that are not referenced anywhere and are older than cutoff.
+    Assets with an unknown creation time are kept, they may still be in flight.
+    """
+    orphans = []
+    for asset in assets:
+        asset_id = asset.get(id_field)
+        created_at = parse_created_at(asset.get(created_field))
+        if not asset_id or asset_id in referenced:
+            continue
+        if created_at is None or created_at > cutoff:
+            continue
+        orphans.append(asset_id)
+    return orphans
+
+
+def batched(items: List[str], size: int) -> Iterator[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+async def collect_referenced_assets() -> Dict[str, Set[str]]:
+    """
+    Collect every asset id still referenced by reports, report images,
+    users and feedback entries (which keep a copy of the user's picture)
+    """
+    images: Set[str] = set()
+    drive_files: Set[str] = set()
+
+    async with db_connection.get_db_session() as db:
+        reports = await db.execute(select(Report.images_url, Report.file_url))
+        for images_url, file_url in reports.all():
+            for url in images_url or []:
+                public_id = public_id_from_url(url)
+                if public_id:
+                    images.add(public_id)
+            file_id = drive_file_id_from_url(file_url)
+            if file_id:
+                drive_files.add(file_id)
+
+        for column in (
+            User.image_url,
+            FeedbackUser.user_image_url,
+            ReportImage.image_url,
+        ):
+            rows = await db.execute(select(column).where(column.isnot(None)))
+            for (image_url,) in rows.all():
+                public_id = public_id_from_url(image_url)
+                if public_id:
+                    images.add(public_id)
+
+    return {"images": images, "drive_files": drive_files}
+
+
+async def _delete_in_batches(
+    ids: List[str], limit: int, delete, label: str, dry_run: bool
+) -> int:
+    batch_size = max(1, min(settings.ASSET_GC_BATCH_SIZE, limit))
+    deleted = 0
+    for i, batch in enumerate(batched(ids, batch_size)):
+        if i > 0:
+            # rate limit the provider Admin APIs between batches
+            await asyncio.sleep(settings.ASSET_GC_BATCH_INTERVAL_SECONDS)
+        if dry_run:
+            logging.info(
+                f"[asset_gc] dry run, would delete {len(batch)} {label}: {batch}"
+            )
+            continue
+        try:
+            await delete(batch)
+            deleted += len(batch)
+        except Exception as e:
+            logging.error(f"[asset_gc] failed to delete {label} batch: {e}")
+    return deleted
+
+
+async def run_asset_gc(dry_run: Optional[bool] = None) -> dict:
+    """
+    Reconcile stored Cloudinary images and Drive PDFs against the database
+    and delete the orphans.
+    """
+    dry_run = settings.ASSET_GC_DRY_RUN if dry_run is None else dry_run
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.ASSET_GC_GRACE_HOURS)
+    referenced = await collect_referenced_assets()
+    summary = {"dry_run": dry_run, "images": 0, "drive_files": 0}
+
+    images = []
+    for folder in CLOUDINARY_FOLDERS:
+        images.extend(await list_images(prefix=folder))
+    image_orphans = find_orphans(
+        images, referenced["images"], cutoff, "public_id", "created_at"
+    )
+    logging.info(f"[asset_gc] {len(image_orphans)} orphaned Cloudinary images")
+    summary["images"] = await _delete_in_batches(
+        image_orphans, DELETE_RESOURCES_LIMIT, delete_images, "images", dry_run
+    )
+
+    if settings.GOOGLE_DRIVE_FOLDER_ID:
+        reports_service = ReportService()
+        drive_files = await reports_service.list_google_drive_files(
+            settings.GOOGLE_DRIVE_FOLDER_ID
+        )
+        drive_orphans = find_orphans(
+            drive_files, referenced["drive_files"], cutoff, "id", "createdTime"
+        )
+        logging.info(f"[asset_gc] {len(drive_orphans)} orphaned Drive files")
+        summary["drive_files"] = await _delete_in_batches(
+            drive_orphans,
+            DRIVE_BATCH_LIMIT,
+            reports_service.delete_google_drive_files,
+            "drive files",
+            dry_run,
+        )
+
+    logging.info(f"[asset_gc] finished: {summary}")
+    return summary
+
+
+@scheduler.scheduled_job(
+    "interval",
+    hours=settings.ASSET_GC_INTERVAL_HOURS,
+    id="asset_gc",
+    executor="asyncio",
+    max_instances=1,
+    coalesce=True,
+)
+async def job_asset_gc():
+    if not settings.ASSET_GC_ENABLED:
+        return
+
+    # every worker runs the scheduler, only one of them should collect
+    lock_ttl = settings.ASSET_GC_INTERVAL_HOURS * 3600 // 2
+    if not await redis_client.set(LOCK_KEY, "1", nx=True, ex=max(lock_ttl, 60)):
+        logging.info("[asset_gc] another worker holds the lock, skipping")
+        return
+
+    try:
+        await run_asset_gc()
+    except Exception as e:
+        logging.error(f"[asset_gc] failed: {e}", exc_info=True)
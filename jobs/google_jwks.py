@@ -0,0 +1,26 @@
+import logging
+
+from helpers.config import settings
+from helpers.google_jwks import google_jwks
+from helpers.scheduler import scheduler
+
+
+@scheduler.scheduled_job(
+    "interval",
+    minutes=5,
+    id="google_jwks_refresh",
+    executor="asyncio",
+    max_instances=1,
+    coalesce=True,
+)
+async def job_google_jwks_refresh():
+    """
+    Refresh Google's signing keys before they expire so no login waits on it
+    """
+    if not settings.GOOGLE_USE_ID_TOKEN:
+        return
+
+    try:
+        await google_jwks.refresh(min_ttl=settings.GOOGLE_JWKS_REFRESH_MARGIN)
+    except Exception as e:
+        logging.error(f"[google_jwks] refresh failed: {e}")
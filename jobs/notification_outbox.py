@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from helpers import mailer
+from helpers.config import settings
+from helpers.db import db_connection
+from helpers.metrics import metrics
+from helpers.onesignal import EmailMessage, OneSignalClient
+from helpers.scheduler import scheduler
+from models.notification_outbox import NotificationKind, OutboxStatus
+from services.notification_outbox import NotificationOutboxService
+from services.reports import ReportService
+from services.users import UserService
+
+# WIB, used for the timestamp shown in status emails
+LOCAL_TIMEZONE = timezone(timedelta(hours=7))
+
+_queue_depth: Dict[str, Any] = {}
+
+
+class NotificationSkipped(Exception):
+    """
+    The notification is no longer relevant, e.g. the user was deleted
+    """
+
+
+async def build_otp(notification: dict) -> EmailMessage:
+    """
+    Generate the OTP at send time so a retried or delayed row never
+    delivers a code that was already replaced.
+    """
+    email = notification["payload"]["email"]
+    try:
+        async with db_connection.get_db_session() as db:
+            user = await UserService().get_user_by_email(db, email)
+    except HTTPException as e:
+        if e.status_code == 404:
+            raise NotificationSkipped(f"user {email} no longer exists")
+        raise
+    if user.get("is_verified"):
+        raise NotificationSkipped(f"user {email} is already verified")
+
+    return await mailer.build_otp_email(email_to=email, user_id=user["id"])
+
+
+async def build_status_report(notification: dict) -> EmailMessage:
+    payload = notification["payload"]
+    reports_service = ReportService()
+    try:
+        async with db_connection.get_db_session() as db:
+            category = await reports_service.get_category_by_key(
+                db, payload["category_key"]
+            )
+        category_name = category.get("name")
+    except HTTPException:
+        category_name = payload["category_key"]
+
+    updated_at = notification["created_at"]
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+
+    return mailer.build_status_report_email(
+        email_to=payload["email"],
+        report_id=payload["report_id"],
+        category_name=category_name,
+        status=reports_service.formatted_report_status(payload["status"]),
+        updated_at=updated_at.astimezone(LOCAL_TIMEZONE).strftime("%Y-%m-%d %H:%M:%S"),
+        feedback=payload.get("feedback"),
+    )
+
+
+HANDLERS = {
+    NotificationKind.otp_email.value: build_otp,
+    NotificationKind.status_report_email.value: build_status_report,
+}
+
+
+async def _build(notification: dict) -> EmailMessage:
+    handler = HANDLERS.get(notification["kind"])
+    if handler is None:
+        raise NotificationSkipped(f"unknown notification kind {notification['kind']}")
+    return await handler(notification)
+
+
+def idempotency_key(notification: dict, message: EmailMessage) -> str:
+    """
+    Stable across outbox retries of the same email, so OneSignal drops a
+    resend of one it already accepted. A rebuilt OTP email carries a new
+    code and gets a new key.
+    """
+    return str(
+        uuid.uuid5(
+            uuid.NAMESPACE_URL,
+            f"outbox:{notification['id']}:{message.subject}:{message.html_body}",
+        )
+    )
+
+
+async def _deliver(notification: dict) -> None:
+    message = await _build(notification)
+    await OneSignalClient.send_email(
+        [message.email_to],
+        message.subject,
+        message.html_body,
+        idempotency_key=idempotency_key(notification, message),
+    )
+
+
+async def dispatch_batch(limit: Optional[int] = None) -> dict:
+    """
+    Send one batch of due notifications concurrently and record the outcome
+    of each: sent, skipped, scheduled for retry, or dead.
+    """
+    outbox_service = NotificationOutboxService()
+    async with db_connection.get_db_session() as db:
+        notifications = await outbox_service.claim_batch(
+            db, limit or settings.OUTBOX_BATCH_SIZE
+        )
+    summary = {
+        "claimed": len(notifications),
+        "sent": 0,
+        "skipped": 0,
+        "retried": 0,
+        "dead": 0,
+    }
+    if not notifications:
+        return summary
+
+    results = await asyncio.gather(
+        *(_deliver(notification) for notification in notifications),
+        return_exceptions=True,
+    )
+
+    sent_ids = []
+    async with db_connection.get_db_session() as db:
+        for notification, result in zip(notifications, results):
+            if result is None:
+                sent_ids.append(notification["id"])
+                continue
+            if isinstance(result, NotificationSkipped):
+                logging.info(f"[outbox] skipped {notification['id']}: {result}")
+                await outbox_service.mark_skipped(db, notification, str(result))
+                summary["skipped"] += 1
+                continue
+            status = await outbox_service.mark_failed(db, notification, str(result))
+            summary["dead" if status == OutboxStatus.dead else "retried"] += 1
+        await outbox_service.mark_sent(db, sent_ids)
+
+    summary["sent"] = len(sent_ids)
+    metrics.inc("outbox_sent", summary["sent"])
+    metrics.inc("outbox_skipped", summary["skipped"])
+    metrics.inc("outbox_retried", summary["retried"])
+    metrics.inc("outbox_dead", summary["dead"])
+    return summary
+
+
+async def refresh_queue_depth() -> None:
+    async with db_connection.get_db_session() as db:
+        depth = await NotificationOutboxService().queue_depth(db)
+    _queue_depth.clear()
+    _queue_depth.update(depth)
+
+
+metrics.register_gauge("notification_outbox", lambda: dict(_queue_depth))
+
+
+@scheduler.scheduled_job(
+    "interval",
+    seconds=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    id="notification_outbox",
+    executor="asyncio",
+    max_instances=1,
+    coalesce=True,
+)
+async def job_notification_outbox():
+    if not settings.OUTBOX_ENABLED:
+        return
+
+    try:
+        # drain full batches right away instead of waiting for the next tick
+        while True:
+            summary = await dispatch_batch()
+            if summary["claimed"]:
+                logging.info(f"[outbox] {summary}")
+            if summary["claimed"] < settings.OUTBOX_BATCH_SIZE:
+                break
+        await refresh_queue_depth()
+    except Exception as e:
+        logging.error(f"[outbox] dispatcher failed: {e}")
+
+
+@scheduler.scheduled_job(
+    "interval",
+    hours=1,
+    id="notification_outbox_purge",
+    executor="asyncio",
+    max_instances=1,
+    coalesce=True,
+)
+async def job_notification_outbox_purge():
+    if not settings.OUTBOX_ENABLED:
+        return
+
+    older_than = datetime.now(timezone.utc) - timedelta(
+        hours=settings.OUTBOX_RETENTION_HOURS
+    )
+    try:
+        async with db_connection.get_db_session() as db:
+            purged = await NotificationOutboxService().purge_sent(db, older_than)
+        if purged:
+            logging.info(f"[outbox] purged {purged} sent notifications")
+    except Exception as e:
+        logging.error(f"[outbox] purge failed: {e}")
@@ -8,11 +8,16 @@ from sqlalchemy.orm import close_all_sessions
 import logging
 import uvicorn
 from helpers import cors, log, rate_limiter, static, router
-from helpers.scheduler import setup as scheduler_setup
+from helpers.scheduler import scheduler, setup as scheduler_setup
+from helpers.scheduler import startup_event as scheduler_startup
+from helpers.scheduler import shutdown_event as scheduler_shutdown
 from helpers.db import db_connection
 from helpers.config import settings
 from middleware.rbac_middleware import RBACMiddleware
 from helpers.aiohttp import SingletonAiohttp
+from helpers.n8n import SingletonN8nClient
+from helpers.mailer import smtp_pool, warm_template_cache
+from helpers.common import password_executor
 
 # Setup logging
 log.setup()
@@ -24,8 +29,12 @@ async def lifespan(app: FastAPI):
         logging.info("Starting application...")
         logging.info("Initializing database connection & tables")
         SingletonAiohttp.get_aiohttp_client()
+        SingletonN8nClient.get_client()
+        warm_template_cache()
         await db_connection.init()
         logging.info("Database initialized successfully")
+        # event handlers are ignored when a lifespan is set, start jobs here
+        await scheduler_startup()
         yield
     except Exception as e:
         logging.error(f"Error during startup: {e}")
@@ -33,8 +42,13 @@ async def lifespan(app: FastAPI):
     finally:
         logging.info("Shutting down application...")
         try:
+            if scheduler.running:
+                await scheduler_shutdown()
             close_all_sessions()
             await SingletonAiohttp.close_aiohttp_client()
+            await SingletonN8nClient.close_client()
+            await smtp_pool.close()
+            password_executor.shutdown(wait=False)
             await db_connection.close()
             logging.info("Application shutdown complete")
         except Exception as e:
@@ -55,7 +69,8 @@ if "--port" in sys.argv:
     except (IndexError, ValueError):
         pass
 
-# Setup Middleware
+# Setup Middleware, added first so CORS answers preflights before it
+app.add_middleware(RBACMiddleware, jwt_secret=settings.JWT_SECRET)
 cors.setup(app)
 rate_limiter.setup(app)
 
@@ -1,22 +1,78 @@
 import logging
-from typing import List, Callable, Optional
+import re
+from typing import List, Callable, Optional, Pattern
 from functools import wraps
 import time
 from datetime import datetime
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
-from jose import jwt, JWTError
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-
+from jose import jwt, ExpiredSignatureError, JWTError
+from starlette.types import ASGIApp, Receive, Scope, Send
+from helpers.jwt import REFRESH_TOKEN_TYPE, decode_token
+from permissions.roles import Role
+from services.auth import AuthService
+
+DEFAULT_ALLOWED_PATHS = [
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/auth/*",
+    "/feedback-user",
+    "/feedback-user/*",
+    "/reports/generate-description",
+    "/reports/generate-description/*",
+    "/static/*",  # Allow access to static files
+]
+
+
+def compile_allowed_paths(allowed_paths: List[str], api_prefix: str) -> Pattern:
+    """
+    One anchored regex for the whole allow-list. Entries match with or
+    without the API prefix and a trailing slash, a trailing `*` matches
+    everything below that path.
+    """
+    alternatives = []
+    for path in allowed_paths:
+        path = path.rstrip("/")
+        if path.endswith("*"):
+            alternatives.append(re.escape(path[:-1]) + ".*")
+        else:
+            alternatives.append(re.escape(path) + "/?")
+    return re.compile(rf"^(?:{re.escape(api_prefix)})?(?:{'|'.join(alternatives)})$")
+
+
+def expired_message(exp_timestamp: int) -> str:
+    # Calculate how long ago the token expired
+    expired_seconds = max(int(time.time()) - exp_timestamp, 0)
+    expired_minutes = expired_seconds // 60
+
+    if expired_minutes < 60:
+        time_ago = f"{expired_minutes} minute{'s' if expired_minutes != 1 else ''}"
+    else:
+        expired_hours = expired_minutes // 60
+        if expired_hours < 24:
+            time_ago = f"{expired_hours} hour{'s' if expired_hours != 1 else ''}"
+        else:
+            expired_days = expired_hours // 24
+            time_ago = f"{expired_days} day{'s' if expired_days != 1 else ''}"
+    return f"Authentication token expired {time_ago} ago. Please login again."
+
+
+class RBACMiddleware:
+    """
+    Pure ASGI middleware authenticating every API request from its bearer
+    token. Paths outside the API prefix (docs, static files) and the
+    allow-list pass through, the verified user is put in `request.state.user`
+    for PermissionChecker to authorize without decoding the token again.
+    """
 
-class RBACMiddleware(BaseHTTPMiddleware):
     def __init__(
         self,
         app: ASGIApp,
         jwt_secret: str,
         allowed_paths: Optional[List[str]] = None,
         roles_field: str = "role",
+        api_prefix: str = "/v1",
     ):
         """
         Initialize RBAC middleware
@@ -26,52 +82,46 @@ class RBACMiddleware(BaseHTTPMiddleware):
             jwt_secret: Secret key for JWT decoding
             allowed_paths: Paths that don't require authentication
             roles_field: Field name in JWT payload that contains roles
+            api_prefix: Prefix of the routes that require authentication
         """
-        super().__init__(app)
-        self.jwt_secret = jwt_secret
-        self.allowed_paths = allowed_paths or []
+        self.app = app
+        self.jwt_secret = jwt_secret or ""
+        self.allowed_paths = (allowed_paths or []) + DEFAULT_ALLOWED_PATHS
         self.roles_field = roles_field
-
-        # Add default public paths
-        self.allowed_paths.extend(
-            [
-                "/docs",
-                "/redoc",
-                "/openapi.json",
-                "/auth/login",
-                "/auth/register",
-                "/auth/google",
-                "/auth/google/callback",
-                "/auth/verify-otp",
-                "/auth/resend-otp",
-                "/auth/me",
-                "/feedback-user",
-                "/static/*",  # Allow access to static files
-            ]
+        self.api_prefix = api_prefix.rstrip("/")
+        self.allowed_pattern = compile_allowed_paths(
+            self.allowed_paths, self.api_prefix
         )
+        self.roles = frozenset(Role.get_roles())
+        self.auth_service = AuthService()
 
         logging.info(
             f"RBAC Middleware initialized with allowed paths: {self.allowed_paths}"
         )
 
-    async def dispatch(self, request: Request, call_next):
-        """
-        Process request through middleware
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._is_public(scope):
+            await self.app(scope, receive, send)
+            return
 
-        Args:
-            request: The incoming request
-            call_next: The next middleware or endpoint to call
+        response = await self._authenticate(scope)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
-        Returns:
-            The response from the next middleware or endpoint
-        """
-        # Check if path is allowed without authentication
-        path = request.url.path
-        if self._is_path_allowed(path):
-            return await call_next(request)
+    def _is_public(self, scope: Scope) -> bool:
+        # CORS preflight requests never carry credentials
+        if scope["method"] == "OPTIONS":
+            return True
+        return self._is_path_allowed(scope["path"])
 
-        # Get token from Authorization header
-        token = self._extract_token(request)
+    async def _authenticate(self, scope: Scope) -> Optional[JSONResponse]:
+        """
+        Verify the bearer token, returns the error response when it is not
+        acceptable, otherwise stores the user in the request state
+        """
+        token = self._extract_token(scope)
         if not token:
             return JSONResponse(
                 status_code=401,
@@ -81,10 +131,11 @@ class RBACMiddleware(BaseHTTPMiddleware):
             )
 
         try:
-            # Decode token
-            payload = jwt.decode(token, self.jwt_secret, algorithms=["HS256"])
+            # verified once per token lifetime, served from the token cache after
+            payload = decode_token(token, self.jwt_secret)
+            if payload.get("typ") == REFRESH_TOKEN_TYPE:
+                raise JWTError("Refresh token used as access token")
 
-            # Check if token is expired
             exp_timestamp = payload.get("exp")
             if not exp_timestamp:
                 return JSONResponse(
@@ -92,41 +143,17 @@ class RBACMiddleware(BaseHTTPMiddleware):
                     content={"message": "Invalid token: missing expiration time."},
                 )
 
-            current_timestamp = int(time.time())
-            if current_timestamp > exp_timestamp:
-                # Calculate how long ago the token expired
-                expired_seconds = current_timestamp - exp_timestamp
-                expired_minutes = expired_seconds // 60
-
-                if expired_minutes < 60:
-                    time_ago = (
-                        f"{expired_minutes} minute{'s' if expired_minutes != 1 else ''}"
-                    )
-                else:
-                    expired_hours = expired_minutes // 60
-                    if expired_hours < 24:
-                        time_ago = (
-                            f"{expired_hours} hour{'s' if expired_hours != 1 else ''}"
-                        )
-                    else:
-                        expired_days = expired_hours // 24
-                        time_ago = (
-                            f"{expired_days} day{'s' if expired_days != 1 else ''}"
-                        )
-
+            if await self.auth_service.is_token_revoked(payload):
                 return JSONResponse(
                     status_code=401,
-                    content={
-                        "message": f"Authentication token expired {time_ago} ago. Please login again.",
-                        "code": "token_expired",
-                    },
+                    content={"message": "Token has been revoked, please login again"},
                 )
 
             # Extract role from payload
-            role = payload.get(self.roles_field, "").lower()
+            role = (payload.get(self.roles_field) or "").lower()
 
             # Check if role is valid
-            if not role or (role != "user" and role != "admin"):
+            if role not in self.roles:
                 return JSONResponse(
                     status_code=403,
                     content={
@@ -135,20 +162,28 @@ class RBACMiddleware(BaseHTTPMiddleware):
                 )
 
             # Add user info to request state
-            request.state.user = {
+            scope.setdefault("state", {})["user"] = {
                 "id": payload.get("sub"),
                 "email": payload.get("email"),
                 "name": payload.get("name"),
                 "role": role,
                 "image_url": payload.get("image_url"),
                 "is_verified": payload.get("is_verified", False),
+                "permissions": payload.get("permissions", 0),
                 "exp": exp_timestamp,
                 "token_expiration": datetime.fromtimestamp(exp_timestamp).isoformat(),
             }
+            return None
 
-            # Continue with the request
-            return await call_next(request)
-
+        except ExpiredSignatureError:
+            exp_timestamp = jwt.get_unverified_claims(token).get("exp", 0)
+            return JSONResponse(
+                status_code=401,
+                content={
+                    "message": expired_message(int(exp_timestamp)),
+                    "code": "token_expired",
+                },
+            )
         except JWTError as e:
             logging.error(f"JWT decode error: {str(e)}")
             return JSONResponse(
@@ -163,37 +198,30 @@ class RBACMiddleware(BaseHTTPMiddleware):
                 status_code=500, content={"message": "Internal server error"}
             )
 
-    def _extract_token(self, request: Request) -> Optional[str]:
+    def _extract_token(self, scope: Scope) -> Optional[str]:
         """
         Extract token from Authorization header only
 
         Args:
-            request: The request object
+            scope: The ASGI connection scope
 
         Returns:
             Optional[str]: The token if found, None otherwise
         """
-        # Get from Authorization header
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            return auth_header[
-                7:
-            ].strip()  # Remove 'Bearer ' prefix and trim whitespace
-
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth_header = value.decode("latin-1")
+                if auth_header.startswith("Bearer "):
+                    # Remove 'Bearer ' prefix and trim whitespace
+                    return auth_header[7:].strip() or None
+                return None
         return None
 
     def _is_path_allowed(self, path: str) -> bool:
-        """Check if path is in allowed paths list"""
-        # If exact path is allowed
-        if path in self.allowed_paths:
+        """Check if path is outside the API or in the allowed paths"""
+        if path != self.api_prefix and not path.startswith(self.api_prefix + "/"):
             return True
-
-        # Check if path starts with any of the allowed paths
-        for allowed_path in self.allowed_paths:
-            if allowed_path.endswith("*") and path.startswith(allowed_path[:-1]):
-                return True
-
-        return False
+        return self.allowed_pattern.match(path) is not None
 
 
 class RoleChecker:
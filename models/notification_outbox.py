@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from enum import Enum
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import ENUM as SQLEnum
+from helpers.common import generate_cuid
+from helpers.db import Base
+
+"""
+Notification kinds:
+- otp_email           payload: {"email"}
+- status_report_email payload: {"email", "report_id", "category_key", "status", "feedback"}
+
+Status :
+- pending  waiting to be sent, or waiting for a retry
+- sent
+- skipped  no longer relevant when it was due (e.g. user deleted or verified)
+- dead     gave up after OUTBOX_MAX_ATTEMPTS, kept for inspection
+"""
+
+
+class NotificationKind(str, Enum):
+    otp_email = "otp_email"
+    status_report_email = "status_report_email"
+
+
+class OutboxStatus(str, Enum):
+    pending = "pending"
+    sent = "sent"
+    skipped = "skipped"
+    dead = "dead"
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "tbl_notification_outbox"
+    __table_args__ = (
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(String(25), primary_key=True, default=generate_cuid)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(
+        SQLEnum(OutboxStatus, name="outboxstatus"),
+        default=OutboxStatus.pending,
+        nullable=False,
+    )
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String(500), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __init__(self, kind: NotificationKind, payload: dict):
+        self.kind = kind.value
+        self.payload = payload
+        self.status = OutboxStatus.pending
+        self.attempts = 0
+        self.next_attempt_at = datetime.now(timezone.utc)
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = datetime.now(timezone.utc)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "next_attempt_at": self.next_attempt_at,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
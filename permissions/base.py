@@ -1,7 +1,8 @@
 from enum import Enum
-from typing import Union, Type
+from functools import lru_cache
+from typing import Dict, Union, Type
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass(init=False, eq=False)
@@ -52,6 +53,14 @@ class PermissionType(str, Enum):
         return f"{self.value}"
 
 
+@lru_cache(maxsize=None)
+def model_permission_prefix(model_name: str) -> str:
+    """
+    `UsersProfile` -> `USERS_PROFILE`
+    """
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", model_name).upper()
+
+
 @dataclass(eq=False)
 class ModelPermission(Permission):
     """
@@ -62,13 +71,19 @@ class ModelPermission(Permission):
 
     permission_type: Union[PermissionType, str]
     permission_model: Type
+    _full_name: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # interned once, the name is hashed and compared on every permission check
+        model_name = model_permission_prefix(self.permission_model.__name__)
+        self._full_name = f"{model_name}_{self.permission_type.__str__().upper()}"
 
     @property
     def full_name(self) -> str:
-        model_name = re.sub(
-            r"(?<!^)(?=[A-Z])", "_", self.permission_model.__name__
-        ).upper()
-        return f"{model_name}_{self.permission_type.__str__().upper()}"
+        return self._full_name
+
+    def __hash__(self):
+        return hash(self._full_name)
 
     def __str__(self):
         return self.full_name
@@ -95,6 +110,9 @@ class ModelDefaultPermissions:
         )
 
 
+_default_permissions: Dict[Type, ModelDefaultPermissions] = {}
+
+
 class ModelPermissions:
     """
     Provides the default set of permissions
@@ -104,4 +122,6 @@ class ModelPermissions:
     @classmethod
     @property
     def permissions(cls) -> ModelDefaultPermissions:  # noqa
-        return ModelDefaultPermissions(cls)
+        if cls not in _default_permissions:
+            _default_permissions[cls] = ModelDefaultPermissions(cls)
+        return _default_permissions[cls]
@@ -19,3 +19,7 @@ class Districts(ModelPermissions):
 
 class Villages(ModelPermissions):
     pass
+
+
+class Metrics(ModelPermissions):
+    pass
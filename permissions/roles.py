@@ -1,4 +1,7 @@
+import zlib
 from enum import Enum
+from typing import Dict, FrozenSet, Iterable, Optional
+from permissions.base import ModelPermissions, PermissionType, model_permission_prefix
 from permissions.model_permission import *
 
 
@@ -39,6 +42,9 @@ ROLE_PERMISSIONS = {
             Villages.permissions.UPDATE,
             Villages.permissions.DELETE,
         ],
+        [
+            Metrics.permissions.READ,
+        ],
     ],
     Role.USER: [
         [
@@ -60,9 +66,57 @@ ROLE_PERMISSIONS = {
 }
 
 
-def get_role_permissions(role: Role):
-    permissions = set()
-    for permissions_group in ROLE_PERMISSIONS[role]:
-        for permission in permissions_group:
-            permissions.add(str(permission))
-    return list(permissions)
+# Interned at import time so a permission check is a single set lookup or
+# bit operation instead of rebuilding the role's permissions per request.
+ROLE_PERMISSION_SETS: Dict[str, FrozenSet[str]] = {
+    role.value: frozenset(
+        permission.full_name
+        for permissions_group in permissions_groups
+        for permission in permissions_group
+    )
+    for role, permissions_groups in ROLE_PERMISSIONS.items()
+}
+
+# one bit per known permission, sorted so every worker assigns the same bits
+PERMISSION_BITS: Dict[str, int] = {
+    name: 1 << index
+    for index, name in enumerate(
+        sorted(
+            f"{model_permission_prefix(model.__name__)}_{permission_type.value}"
+            for model in ModelPermissions.__subclasses__()
+            for permission_type in PermissionType
+        )
+    )
+}
+
+# changes whenever the bit assignment does, so masks signed into tokens
+# before a permission was added are not read with the new bits
+PERMISSION_BITS_VERSION: int = zlib.crc32(",".join(PERMISSION_BITS).encode()) & 0xFFFF
+
+
+def permission_mask(permissions: Iterable) -> int:
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[str(permission)]
+    return mask
+
+
+ROLE_PERMISSION_MASKS: Dict[str, int] = {
+    role: permission_mask(names) for role, names in ROLE_PERMISSION_SETS.items()
+}
+
+
+def get_role_permissions(role: Optional[Role]) -> FrozenSet[str]:
+    return ROLE_PERMISSION_SETS.get(role, frozenset())
+
+
+def get_role_mask(role: Optional[Role]) -> int:
+    return ROLE_PERMISSION_MASKS.get(role, 0)
+
+
+def mask_covers(mask: int, required_mask: int) -> bool:
+    return mask & required_mask == required_mask
+
+
+def has_permissions(role: Optional[Role], required_mask: int) -> bool:
+    return mask_covers(get_role_mask(role), required_mask)
@@ -13,17 +13,30 @@ from helpers.google_auth import GoogleAuth
 from sqlalchemy.ext.asyncio import AsyncSession
 from helpers.db import db_connection, get_db
 from helpers.jwt import JwtHelper
+from helpers.rate_limiter import client_ip, login_throttle
 from middleware.rbac_middleware import verify_role
 from schemas.users import UserCreate
 from services.auth import AuthService
 import redis.asyncio as redis
 from helpers.config import settings
-from helpers.mailer import send_email_async, send_otp_email, send_otp_email_async
+from helpers.mailer import send_email_async
 from schemas.otp import OTPRequest, OTPResendRequest, OTPResponse
-from schemas.auth import BasicAuthRequest
-from helpers.redis import get_redis_value, set_redis_value, delete_redis_value
+from schemas.auth import BasicAuthRequest, RefreshTokenRequest
+from helpers.redis import (
+    OTP_EXPIRED,
+    OTP_LOCKED,
+    OTP_SEND_COOLDOWN,
+    OTP_SEND_LIMITED,
+    OTP_VALID,
+    consume_oauth_state,
+    reserve_otp_send,
+    set_redis_value,
+    verify_and_consume_otp,
+)
 
 from services.users import UserService
+from services.notification_outbox import NotificationOutboxService
+from models.notification_outbox import NotificationKind
 
 is_production = (
     os.getenv("ENVIRONMENT", "development").lower() == "production"
@@ -32,6 +45,33 @@ is_production = (
 
 routes_auth = APIRouter(prefix="/auth", tags=["Auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+REFRESH_COOKIE = "refresh_token"
+
+
+async def issue_refresh_token(auth_service: AuthService, user_id: str) -> Optional[str]:
+    """
+    The login itself must not fail when Redis does, the client logs in
+    again once the access token expires.
+    """
+    try:
+        return await auth_service.issue_refresh_token(user_id)
+    except redis.RedisError as e:
+        logging.error(f"Failed to issue refresh token: {str(e)}")
+        return None
+
+
+def set_refresh_cookie(response: Response, refresh_token: Optional[str]) -> None:
+    if not refresh_token:
+        return
+    response.set_cookie(
+        REFRESH_COOKIE,
+        refresh_token,
+        max_age=settings.JWT_REFRESH_TOKEN_EXPIRE_SECONDS,
+        httponly=True,
+        secure=is_production,
+        samesite="lax",
+        path="/v1/auth",
+    )
 
 
 @routes_auth.get(
@@ -62,18 +102,10 @@ async def get_user_info(
                 status_code=401, content={"message": "Authentication required"}
             )
 
+        # access tokens only carry the user id and role, the profile
+        # always comes from the user record
         payload = jwt_helper.decode(token_value)
-        user_info = {
-            "id": payload.get("sub"),
-            "email": payload.get("email"),
-            "name": payload.get("name"),
-            "picture": payload.get("picture"),
-            "role": payload.get("role"),
-            "is_verified": payload.get("is_verified"),
-            "expire": payload.get("exp"),
-        }
-
-        user_id = user_info.get("id")
+        user_id = payload.get("sub")
         if not user_id or not isinstance(user_id, str):
             return JSONResponse(
                 status_code=401, content={"message": "Invalid user ID in token"}
@@ -126,28 +158,47 @@ async def login(
             status_code=400,
             content={"message": "Email and password are required"},
         )
+    ip = client_ip(request)
+    # refused before any database or bcrypt work
+    retry_after, attempt = await login_throttle.reserve(email, ip)
+    if retry_after:
+        return JSONResponse(
+            status_code=429,
+            content={
+                "message": "Too many failed login attempts, please try again later",
+                "data": {"retry_after": retry_after},
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
     try:
-        user = await user_service.get_user_by_email(db, email)
-        print(f"User: {user}")
-        if not user:
-            raise HTTPException(status_code=401, detail="Email not registered")
-
-        if not user["password"]:
+        try:
+            user = await user_service.get_user_by_email(db, email)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            user = None
+        if not user or not user["password"]:
+            login_throttle.record_failure()
             raise HTTPException(status_code=401, detail="Email not registered")
 
-        if not user_service.verify_password(password, user["password"]):
+        if not await user_service.check_password(db, user, password):
+            login_throttle.record_failure()
             raise HTTPException(status_code=401, detail="Invalid password")
 
+        await login_throttle.release(email, ip, attempt)
         token = jwt_helper.create_token(user_data=user)
+        refresh_token = await issue_refresh_token(auth_service, user["id"])
 
         response = JSONResponse(
             content={
                 "message": "Login successful",
                 "data": {
                     "token": token,
+                    "refresh_token": refresh_token,
                 },
             }
         )
+        set_refresh_cookie(response, refresh_token)
         return response
     except HTTPException as e:
         logging.error(f"Login error: {e.status_code}: {e.detail}")
@@ -163,6 +214,101 @@ async def login(
         )
 
 
+@routes_auth.post(
+    "/refresh",
+    summary="Refresh Access Token",
+    description="Exchange a refresh token for a new access token and refresh token",
+)
+async def refresh_access_token(
+    request: Request,
+    payload: Optional[RefreshTokenRequest] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    auth_service = AuthService()
+    user_service = UserService()
+    jwt_helper = JwtHelper()
+    try:
+        presented = (payload and payload.refresh_token) or request.cookies.get(
+            REFRESH_COOKIE
+        )
+        if not presented:
+            raise HTTPException(status_code=401, detail="Refresh token required")
+
+        try:
+            claims = jwt_helper.decode_refresh_token(presented)
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+        # the current role goes into the new access token, and deleted users
+        # cannot refresh
+        try:
+            user = await user_service.get_user(db, claims["sub"])
+        except HTTPException:
+            await auth_service.revoke_refresh_token(claims)
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+        next_refresh_token = await auth_service.rotate_refresh_token(claims)
+        token = jwt_helper.create_token(user)
+
+        response = JSONResponse(
+            content={
+                "message": "Token refreshed successfully",
+                "data": {
+                    "token": token,
+                    "refresh_token": next_refresh_token,
+                },
+            }
+        )
+        set_refresh_cookie(response, next_refresh_token)
+        return response
+    except HTTPException as e:
+        logging.error(f"Refresh token error: {e.status_code}: {e.detail}")
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"message": str(e.detail)},
+        )
+    except Exception as e:
+        logging.error(f"Refresh token error: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"message": "Internal server error"},
+        )
+
+
+@routes_auth.post(
+    "/logout",
+    summary="Logout",
+    description="Revoke the refresh token of the current session",
+)
+async def logout(
+    request: Request,
+    payload: Optional[RefreshTokenRequest] = None,
+):
+    auth_service = AuthService()
+    jwt_helper = JwtHelper()
+    try:
+        presented = (payload and payload.refresh_token) or request.cookies.get(
+            REFRESH_COOKIE
+        )
+        if presented:
+            try:
+                await auth_service.revoke_refresh_token(
+                    jwt_helper.decode_refresh_token(presented)
+                )
+            except JWTError:
+                pass
+
+        response = JSONResponse(content={"message": "Logout successful"})
+        response.delete_cookie(REFRESH_COOKIE, path="/v1/auth")
+        return response
+    except Exception as e:
+        logging.error(f"Logout error: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"message": "Internal server error"},
+        )
+
+
 @routes_auth.post(
     "/register",
     summary="Register User",
@@ -203,8 +349,16 @@ async def register(
                 "nik": nik,
             }
 
+            # committed together with the user, sent by the outbox dispatcher
+            outbox_service = NotificationOutboxService()
+            outbox_service.enqueue(db, NotificationKind.otp_email, {"email": email})
             created_user = await user_service.create_user(db, user_data)
             print(f"User created: {created_user}")
+            try:
+                # starts the resend cooldown for the OTP queued above
+                await reserve_otp_send(created_user["id"])
+            except HTTPException as e:
+                logging.error(f"Failed to record OTP send: {e.detail}")
 
             token = create_verification_token(created_user["email"])
             logging.info(f"Verification token: {token}")
@@ -214,23 +368,8 @@ async def register(
             # )
             # logging.info(f"Email verification endpoint: {email_verification_endpoint}")
 
-            # Send OTP email
-            otp_sent = False
-            otp_error = None
-            try:
-                logging.info(f"Sending OTP to: {created_user['email']}")
-
-                otp_sent = await send_otp_email(
-                    email_to=created_user["email"],
-                    user_id=created_user["id"],
-                )
-                if otp_sent:
-                    logging.info(f"OTP sent successfully to {created_user['email']}")
-                else:
-                    logging.warning(f"OTP sending failed, but user was created")
-            except Exception as e:
-                otp_error = str(e)
-                logging.error(f"Error sending OTP: {otp_error}")
+            otp_sent = True
+            logging.info(f"OTP queued for: {created_user['email']}")
 
             # Prepare response
             message = (
@@ -291,8 +430,18 @@ async def verify_otp(
             if not existing_user:
                 raise HTTPException(status_code=400, detail="Email not registered")
 
-            stored_otp = await get_redis_value(f"otp:{existing_user['id']}")
-            if not stored_otp or stored_otp != otp:
+            # compared and consumed in one step, a code works only once
+            result = await verify_and_consume_otp(existing_user["id"], otp)
+            if result == OTP_LOCKED:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many invalid attempts, please request a new OTP",
+                )
+            if result == OTP_EXPIRED:
+                raise HTTPException(
+                    status_code=400, detail="OTP expired, please request a new OTP"
+                )
+            if result != OTP_VALID:
                 raise HTTPException(status_code=400, detail="Invalid OTP")
 
             update_data = {"is_verified": True}
@@ -300,19 +449,19 @@ async def verify_otp(
                 db, existing_user["id"], update_data
             )
 
-            # Clear OTP from Redis
-            await delete_redis_value(f"otp:{existing_user['id']}")
-
             token = jwt_helper.create_token(updated_user)
+            refresh_token = await issue_refresh_token(auth_service, updated_user["id"])
 
             response = JSONResponse(
                 content={
                     "message": "OTP verified successfully",
                     "data": {
                         "token": token,
+                        "refresh_token": refresh_token,
                     },
                 }
             )
+            set_refresh_cookie(response, refresh_token)
 
             return response
         except HTTPException as e:
@@ -354,24 +503,46 @@ async def resend_otp(
                 raise HTTPException(status_code=400, detail="Email not registered")
             if existing_user["is_verified"]:
                 raise HTTPException(status_code=400, detail="Email already verified")
+            # a resend inside the cooldown window gets the OTP already sent
+            outcome, expires_in, retry_after = await reserve_otp_send(
+                existing_user["id"]
+            )
+            if outcome == OTP_SEND_LIMITED:
+                return JSONResponse(
+                    status_code=429,
+                    content={
+                        "message": "Too many OTP requests, please try again later",
+                        "data": {"retry_after": retry_after},
+                    },
+                    headers={"Retry-After": str(retry_after)},
+                )
+            if outcome == OTP_SEND_COOLDOWN:
+                return JSONResponse(
+                    content={
+                        "message": "OTP already sent, please check your email",
+                        "data": {
+                            "id": existing_user["id"],
+                            "email": existing_user["email"],
+                            "otp_sent": False,
+                            "expires_in": expires_in,
+                            "retry_after": retry_after,
+                        },
+                    }
+                )
+
             # Send OTP email
             otp_sent = False
-            otp_error = None
             try:
-
-                await delete_redis_value(f"otp:{existing_user['id']}")
-                logging.info(f"Resending OTP to: {existing_user['email']}")
-                otp_sent = await send_otp_email(
-                    email_to=existing_user["email"],
-                    user_id=existing_user["id"],
+                outbox_service = NotificationOutboxService()
+                outbox_service.enqueue(
+                    db, NotificationKind.otp_email, {"email": existing_user["email"]}
                 )
-                if otp_sent:
-                    logging.info(f"OTP sent successfully to {existing_user['email']}")
-                else:
-                    logging.warning(f"OTP sending failed")
+                await db.commit()
+                otp_sent = True
+                logging.info(f"OTP resend queued for: {existing_user['email']}")
             except Exception as e:
-                otp_error = str(e)
-                logging.error(f"Error sending OTP: {otp_error}")
+                await db.rollback()
+                logging.error(f"Error queueing OTP: {str(e)}")
 
             message = "OTP resent to your email" if otp_sent else "Failed to resend OTP"
 
@@ -382,6 +553,8 @@ async def resend_otp(
                         "id": existing_user["id"],
                         "email": existing_user["email"],
                         "otp_sent": otp_sent,
+                        "expires_in": expires_in,
+                        "retry_after": retry_after,
                     },
                 }
             )
@@ -442,6 +615,8 @@ async def auth_google(
     request: Request,
     db: AsyncSession = Depends(get_db),
 ):
+    # where errors are redirected to until the state tells us the origin
+    redirect_uri = GoogleAuth.get_frontend_uri() or "/"
     try:
         auth_service = AuthService()
         user_service = UserService()
@@ -452,13 +627,14 @@ async def auth_google(
             f"Authenticating with Google request url: {request.headers.get('origin')}"
         )
 
-        redirect_uri = await get_redis_value(f"redirect_uri:{state}")
-        if not redirect_uri:
+        # single use, read and deleted in one round trip
+        oauth_state = await consume_oauth_state(state)
+        state_redirect = oauth_state.get("redirect_uri")
+        if not state_redirect:
             raise HTTPException(
                 status_code=400, detail="Invalid or expired state token"
             )
-
-        path = await get_redis_value(f"path:{state}")
+        redirect_uri = state_redirect
         user_info = await auth_service.authenticate_with_google(code, request)
         if not user_info:
             raise HTTPException(
@@ -529,10 +705,11 @@ async def auth_google(
         #     else:
         #         frontend_url += custom_path
         redirect_response = RedirectResponse(url=f"{frontend_url}home?token={token}")
-
-        await delete_redis_value(f"redirect_uri:{state}")
-        if path:
-            await delete_redis_value(f"path:{state}")
+        # never in the URL, the refresh token only travels in the cookie
+        set_refresh_cookie(
+            redirect_response,
+            await issue_refresh_token(auth_service, user_info["id"]),
+        )
 
         return redirect_response
     except HTTPException as e:
@@ -0,0 +1,36 @@
+import logging
+from fastapi import APIRouter, Depends, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from helpers.metrics import metrics
+from services.auth import PermissionChecker
+from permissions.model_permission import Metrics as MetricsPermissions
+
+routes_metrics = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@routes_metrics.get(
+    "/",
+    response_model=dict,
+    summary="Get application metrics",
+)
+async def get_metrics(
+    dependencies=Depends(PermissionChecker([MetricsPermissions.permissions.READ])),
+) -> JSONResponse:
+    """
+    Get in-process counters and gauges of this worker
+    """
+    try:
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={
+                "message": "Metrics retrieved successfully",
+                "data": jsonable_encoder(metrics.snapshot()),
+            },
+        )
+    except Exception as e:
+        logging.error(f"Error fetching metrics: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"message": "Failed to fetch metrics"},
+        )
@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 from datetime import datetime, timedelta, timezone
 import logging
 from math import log
@@ -16,10 +17,9 @@ from fastapi import (
     BackgroundTasks,
 )
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from helpers import mailer
 from helpers.common import create_verification_token
 from sqlalchemy.ext.asyncio import AsyncSession
 from helpers.db import db_connection, get_db
@@ -29,9 +29,11 @@ from models.district import District
 from services.auth import AuthService, PermissionChecker
 import redis.asyncio as redis
 from schemas.reports import *
-from httpx import AsyncClient
 from helpers.config import settings
 from services.reports import ReportService
+from services.description import DescriptionService
+from services.notification_outbox import NotificationOutboxService
+from models.notification_outbox import NotificationKind
 from permissions.model_permission import Reports as ReportPermissions
 from helpers.common import generate_cuid
 from services.district import DistrictService
@@ -124,24 +126,16 @@ async def create_report_category(
         )
 
 
-@routes_report.post(
-    "/generate-description",
-    response_model=dict,
-    summary="Generate description",
-)
-async def generate_description(
-    request: Request,
-    generate_request: DescriptionRequest,
-    db: AsyncSession = Depends(get_db),
-) -> JSONResponse:
+async def build_description_payload(generate_request: DescriptionRequest) -> dict:
     """
-    Generate description
+    Resolve category, district and village names for the n8n payload.
+    The session is released before the slow n8n call starts.
     """
-    try:
-        # geerate report time
-        report_id = generate_cuid()
-        generate_request.report_id = report_id
+    # geerate report time
+    report_id = generate_cuid()
+    generate_request.report_id = report_id
 
+    async with db_connection.get_db_session() as db:
         # get category
         reports_service = ReportService()
         category = await reports_service.get_category_by_key(
@@ -154,42 +148,46 @@ async def generate_description(
             db, generate_request.district_id
         )
         if not district:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={"message": "District not found"},
-            )
+            raise HTTPException(status_code=404, detail="District not found")
+
         # get village
         village_service = VillageService()
         village = await village_service.get_village_by_id(
             db, generate_request.village_id
         )
 
-        request_payload = {
-            "report_id": report_id,
-            "category_name": category.get("name"),
-            "district_name": district.get("name"),
-            "village_name": village.get("name"),
-            "description": generate_request.description,
-            "location": generate_request.location,
-        }
+    return {
+        "report_id": report_id,
+        "category_name": category.get("name"),
+        "district_name": district.get("name"),
+        "village_name": village.get("name"),
+        "description": generate_request.description,
+        "location": generate_request.location,
+    }
 
-        async with AsyncClient() as client:
-            print(f"N8N API URL: {settings.N8N_API_URL}")
-            response = await client.post(
-                f"{settings.N8N_API_URL}/webhook/generate-description",
-                json=request_payload,
-                timeout=20,
-            )
-            if response.status_code != 200:
-                return JSONResponse(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    content={"message": "Failed to generate description"},
-                )
+
+@routes_report.post(
+    "/generate-description",
+    response_model=dict,
+    summary="Generate description",
+)
+async def generate_description(
+    request: Request,
+    generate_request: DescriptionRequest,
+) -> JSONResponse:
+    """
+    Generate description
+    """
+    try:
+        request_payload = await build_description_payload(generate_request)
+
+        description_service = DescriptionService()
+        description = await description_service.generate(request_payload)
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "message": "Description generated successfully",
-                "data": jsonable_encoder(response.json()),
+                "data": jsonable_encoder(description),
             },
         )
     except HTTPException as e:
@@ -202,6 +200,57 @@ async def generate_description(
         )
 
 
+@routes_report.post(
+    "/generate-description/stream",
+    summary="Generate description (Server-Sent Events)",
+)
+async def generate_description_stream(
+    request: Request,
+    generate_request: DescriptionRequest,
+):
+    """
+    Generate description and stream it as Server-Sent Events
+    (`chunk` events, then `done`, or `error`)
+    """
+    try:
+        description_service = DescriptionService()
+        if not description_service.is_available():
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={
+                    "message": "Description service is busy, please try again later"
+                },
+            )
+
+        request_payload = await build_description_payload(generate_request)
+
+        async def event_stream():
+            # closed right away on disconnect, releasing the bulkhead slot and
+            # the upstream response instead of waiting for garbage collection
+            async with contextlib.aclosing(
+                description_service.stream(request_payload)
+            ) as events:
+                async for event in events:
+                    if await request.is_disconnected():
+                        logging.info("Client disconnected, stopping description stream")
+                        break
+                    yield event
+
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={"message": e.detail})
+    except Exception as e:
+        logging.error(f"Error generating description: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={"message": "Failed to generate description"},
+        )
+
+
 @routes_report.post("/images", summary="Upload images")
 async def upload_images(
     request: Request,
@@ -473,29 +522,23 @@ async def update_report(
                 content={"message": "Report not found"},
             )
 
-        updated_report = await reports_service.update_report(db, report_id, payload)
-        category = await reports_service.get_category_by_key(
-            db, updated_report.get("category_key")
-        )
-        formatted_time = (
-            updated_report.get("updated_at")
-            .replace(tzinfo=timezone.utc)
-            .astimezone(timezone(timedelta(hours=7)))
-            .strftime("%Y-%m-%d %H:%M:%S")
-        )
-        status_formatted = reports_service.formatted_report_status(
-            updated_report.get("status")
-        )
-        print(f"Report status: {status_formatted}")
-
-        await mailer.send_status_report_email(
-            email_to=report.get("user").get("email"),
-            report_id=report_id,
-            category_name=category.get("name"),
-            status=status_formatted,
-            updated_at=formatted_time,
-            feedback=updated_report.get("feedback"),
+        # snapshot of the report after the update, committed with it
+        updated_fields = payload.model_dump(exclude_unset=True)
+        outbox_service = NotificationOutboxService()
+        outbox_service.enqueue(
+            db,
+            NotificationKind.status_report_email,
+            jsonable_encoder(
+                {
+                    "email": report.get("user").get("email"),
+                    "report_id": report_id,
+                    "category_key": report.get("category_key"),
+                    "status": updated_fields.get("status", report.get("status")),
+                    "feedback": updated_fields.get("feedback", report.get("feedback")),
+                }
+            ),
         )
+        updated_report = await reports_service.update_report(db, report_id, payload)
 
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -11,7 +11,7 @@ from schemas.users import UserCreate, UserUpdate, UserCreateByAdmin
 from typing import List, Optional, Annotated
 from fastapi import UploadFile
 from fastapi.responses import JSONResponse
-from services.auth import get_role_permissions, PermissionChecker
+from services.auth import AuthService, get_role_permissions, PermissionChecker
 from helpers.redis import (
     get_redis_client,
     set_redis_value,
@@ -216,6 +216,7 @@ async def delete_user(
     try:
         user_service = UserService()
         await user_service.delete_user(db, user_id)
+        await AuthService.revoke_user_tokens(user_id)
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={"message": "User deleted successfully"},
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel, EmailStr, field_validator
 
 
@@ -11,3 +12,8 @@ class BasicAuthRequest(BaseModel):
     #     if len(v) < 8:
     #         raise ValueError("Password must be at least 8 characters long")
     #     return v
+
+
+class RefreshTokenRequest(BaseModel):
+    # browsers send it in the httpOnly refresh_token cookie instead
+    refresh_token: Optional[str] = None
@@ -2,34 +2,76 @@ import logging
 import os
 import secrets
 from urllib.parse import urlencode
+import time
 import redis.asyncio as redis  # Make sure this is the async version
-import requests
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import Dict, List, Tuple
 from jose import jwt, JWTError
 from fastapi import HTTPException, Request, Depends, status
-from helpers.google_auth import GoogleAuth
+from helpers.google_auth import GoogleAuth, GoogleOAuthClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from models.users import User
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
 from sqlalchemy.future import select
-from helpers.redis import set_redis_value, get_redis_value, delete_redis_value
+from helpers.redis import (
+    delete_redis_value,
+    get_redis_value,
+    store_oauth_state,
+)
 from fastapi.security import OAuth2PasswordBearer
 from permissions.base import ModelPermission
-from permissions.roles import get_role_permissions
-from helpers.db import get_db
+from permissions.roles import (
+    get_role_permissions,
+    has_permissions,
+    mask_covers,
+    permission_mask,
+)
+from helpers.db import db_connection, get_db
+from helpers.redis import redis_client
 from helpers.config import settings
 from helpers.jwt import JwtHelper
+from helpers.metrics import metrics
 from services.users import UserService
 
-
 # REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 # redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+REVOCATION_KEY_PREFIX = "auth:revoked"
+REFRESH_FAMILY_KEY_PREFIX = "auth:refresh"
+
+# Moves a refresh token family to its next token only when the presented
+# token is the current one. The token it replaced stays usable for a short
+# grace period and gets the current token back, so two tabs or a retried
+# request refreshing at the same moment do not log the user out. Presenting
+# any older token means it leaked, so the whole family is revoked. Revoked
+# or expired families also leave the user's set of families.
+ROTATE_REFRESH_SCRIPT = """
+local family = redis.call('HMGET', KEYS[1], 'jti', 'prev_jti', 'rotated_at')
+local current = family[1]
+if not current then
+    redis.call('SREM', KEYS[2], ARGV[4])
+    return {0, false}
+end
+if current ~= ARGV[1] then
+    local rotated_at = tonumber(family[3])
+    if family[2] == ARGV[1] and rotated_at
+        and tonumber(ARGV[5]) - rotated_at <= tonumber(ARGV[6]) then
+        return {2, current}
+    end
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[4])
+    return {-1, false}
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2], 'prev_jti', ARGV[1], 'rotated_at', ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {1, ARGV[2]}
+"""
+rotate_refresh_script = redis_client.register_script(ROTATE_REFRESH_SCRIPT)
+# user_id -> (expires at, user)
+_user_cache: Dict[str, Tuple[float, dict]] = {}
 
 
 class BearAuthException(Exception):
@@ -48,8 +90,9 @@ class AuthService:
             google_redirect_uri = GoogleAuth.get_redirect_uri(request)
             print(f"Google Redirect URI: {google_redirect_uri}")
             state_token = secrets.token_urlsafe(16)
-            await set_redis_value(f"redirect_uri:{state_token}", redirect_uri, 3600)
-            await set_redis_value(f"path:{state_token}", path, 3600)
+            await store_oauth_state(
+                state_token, {"redirect_uri": redirect_uri, "path": path}, 3600
+            )
 
             google_auth_url = "https://accounts.google.com/o/oauth2/auth?" + urlencode(
                 {
@@ -72,42 +115,24 @@ class AuthService:
         Authenticate user with Google OAuth2.0
         """
         try:
-            token_url = "https://accounts.google.com/o/oauth2/token"
-
-            data = {
-                "code": code,
-                "client_id": GoogleAuth.get_client_id(),
-                "client_secret": GoogleAuth.get_client_secret(),
-                "redirect_uri": GoogleAuth.get_redirect_uri(request),
-                "grant_type": "authorization_code",
-            }
-            response = requests.post(token_url, data=data)
-
-            if not response.ok:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Google authentication failed: {response.text}",
-                )
-
-            access_token = response.json().get("access_token")
+            tokens = await GoogleOAuthClient.exchange_code(
+                code, GoogleAuth.get_redirect_uri(request)
+            )
 
+            access_token = tokens.get("access_token")
             if not access_token:
                 raise HTTPException(
                     status_code=400, detail="Failed to obtain access token"
                 )
 
-            user_info_response = requests.get(
-                "https://www.googleapis.com/oauth2/v1/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
-
-            if not user_info_response.ok:
-                raise HTTPException(
-                    status_code=user_info_response.status_code,
-                    detail=f"Failed to get user info: {user_info_response.text}",
+            if settings.GOOGLE_USE_ID_TOKEN and tokens.get("id_token"):
+                user_info = await GoogleOAuthClient.userinfo_from_id_token(
+                    tokens["id_token"], access_token
                 )
+                if user_info:
+                    return user_info
 
-            return user_info_response.json()
+            return await GoogleOAuthClient.get_userinfo(access_token)
         except HTTPException:
             raise
         except Exception as e:
@@ -126,6 +151,167 @@ class AuthService:
         except JWTError:
             raise BearAuthException("Token could not be validated")
 
+    def get_token_claims(self, token: str) -> dict:
+        try:
+            claims = JwtHelper().decode(token=token)
+        except JWTError:
+            claims = {}
+        if not claims.get("sub"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate bearer token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return claims
+
+    @staticmethod
+    def revocation_key(user_id: str) -> str:
+        return f"{REVOCATION_KEY_PREFIX}:{user_id}"
+
+    @classmethod
+    async def revoke_user_tokens(cls, user_id: str) -> None:
+        """
+        Reject every token issued to the user before now, call this when
+        the user's role changes or the user is deleted.
+        """
+        _user_cache.pop(user_id, None)
+        families_key = cls.refresh_families_key(user_id)
+        try:
+            families = await redis_client.smembers(families_key)
+            async with redis_client.pipeline(transaction=True) as pipe:
+                # a token cannot outlive its expiry, so neither does the marker
+                pipe.set(
+                    cls.revocation_key(user_id),
+                    round(time.time(), 3),
+                    ex=settings.JWT_ACCESS_TOKEN_EXPIRE_SECONDS,
+                )
+                for family_id in families:
+                    pipe.delete(cls.refresh_family_key(family_id))
+                pipe.delete(families_key)
+                await pipe.execute()
+        except redis.RedisError as e:
+            logging.error(f"Failed to revoke tokens for user {user_id}: {e}")
+
+    @staticmethod
+    def refresh_family_key(family_id: str) -> str:
+        return f"{REFRESH_FAMILY_KEY_PREFIX}:{family_id}"
+
+    @staticmethod
+    def refresh_families_key(user_id: str) -> str:
+        return f"{REFRESH_FAMILY_KEY_PREFIX}:user:{user_id}"
+
+    async def issue_refresh_token(self, user_id: str) -> str:
+        """
+        Start a new refresh token family, one per login
+        """
+        family_id = secrets.token_urlsafe(16)
+        token_id = secrets.token_urlsafe(16)
+        ttl = settings.JWT_REFRESH_TOKEN_EXPIRE_SECONDS
+        families_key = self.refresh_families_key(user_id)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                self.refresh_family_key(family_id),
+                mapping={"jti": token_id, "sub": user_id},
+            )
+            pipe.expire(self.refresh_family_key(family_id), ttl)
+            pipe.sadd(families_key, family_id)
+            pipe.expire(families_key, ttl)
+            await pipe.execute()
+        return JwtHelper().create_refresh_token(user_id, family_id, token_id)
+
+    async def rotate_refresh_token(self, claims: dict) -> str:
+        """
+        Exchange a refresh token for the next one of its family. The token
+        just rotated away still gets the current one back within
+        JWT_REFRESH_GRACE_SECONDS
+        """
+        family_id, token_id = claims.get("fam"), claims.get("jti")
+        if not family_id or not token_id:
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+        next_token_id = secrets.token_urlsafe(16)
+        result = await rotate_refresh_script(
+            keys=[
+                self.refresh_family_key(family_id),
+                self.refresh_families_key(claims["sub"]),
+            ],
+            args=[
+                token_id,
+                next_token_id,
+                settings.JWT_REFRESH_TOKEN_EXPIRE_SECONDS,
+                family_id,
+                time.time(),
+                settings.JWT_REFRESH_GRACE_SECONDS,
+            ],
+        )
+        result, current_token_id = result
+        if result == -1:
+            metrics.inc("refresh_token_reuse")
+            logging.warning(
+                f"Refresh token reuse for user {claims.get('sub')}, session revoked"
+            )
+        if result not in (1, 2):
+            raise HTTPException(
+                status_code=401, detail="Refresh token revoked, please login again"
+            )
+        if result == 2:
+            metrics.inc("refresh_token_grace")
+        return JwtHelper().create_refresh_token(
+            claims["sub"], family_id, current_token_id
+        )
+
+    async def revoke_refresh_token(self, claims: dict) -> None:
+        family_id = claims.get("fam")
+        if not family_id:
+            return
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(self.refresh_family_key(family_id))
+            pipe.srem(self.refresh_families_key(claims.get("sub")), family_id)
+            await pipe.execute()
+
+    async def is_token_revoked(self, claims: dict) -> bool:
+        try:
+            revoked_at = await redis_client.get(self.revocation_key(claims["sub"]))
+        except redis.RedisError as e:
+            # tokens are short-lived, do not lock everyone out when Redis is down
+            logging.warning(f"Token revocation check failed: {e}")
+            return False
+        if revoked_at is None:
+            return False
+        # tokens without iat predate revocation support
+        return float(claims.get("iat", 0)) <= float(revoked_at)
+
+    async def get_current_claims(self, token: str = Depends(oauth2_scheme)) -> dict:
+        """
+        Authenticate from the signed token alone, without a database round trip
+        """
+        claims = self.get_token_claims(token)
+        if await self.is_token_revoked(claims):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked, please login again",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return claims
+
+    async def load_user(self, user_id: str) -> dict:
+        """
+        Full user record for handlers that need more than the token claims,
+        cached in-process for AUTH_USER_CACHE_TTL seconds.
+        """
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        async with db_connection.get_db_session() as db:
+            user = await UserService().get_user(db, user_id)
+        if settings.AUTH_USER_CACHE_TTL > 0:
+            _user_cache[user_id] = (
+                time.monotonic() + settings.AUTH_USER_CACHE_TTL,
+                user,
+            )
+        return user
+
     async def get_current_user(
         self, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
     ):
@@ -148,20 +334,46 @@ class AuthService:
         return user
 
 
+def user_from_claims(claims: dict) -> dict:
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "name": claims.get("name"),
+        "image_url": claims.get("image_url"),
+        "is_verified": claims.get("is_verified", False),
+        "role": claims.get("role"),
+        "permissions": claims.get("permissions", 0),
+    }
+
+
 class PermissionChecker:
     auth_service = AuthService()
 
     def __init__(self, permissions_required: List[ModelPermission]):
         self.permissions_required = permissions_required
+        self.required_mask = permission_mask(permissions_required)
 
-    def __call__(self, user=Depends(auth_service.get_current_user)):
-        for permission_required in self.permissions_required:
-            print(f"user: {user.get('role')}")
-            if permission_required not in get_role_permissions(user.get("role")):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Not enough permissions to access this resource",
-                )
+    async def __call__(self, request: Request, token: str = Depends(oauth2_scheme)):
+        # RBACMiddleware already verified the token and checked revocation
+        verified = getattr(request.state, "user", None)
+        if verified and settings.AUTH_STATELESS:
+            user = verified
+            allowed = mask_covers(user["permissions"], self.required_mask)
+        elif settings.AUTH_STATELESS:
+            # the permission mask comes from the signed token, no lookup at all
+            claims = await self.auth_service.get_current_claims(token)
+            user = user_from_claims(claims)
+            allowed = mask_covers(user["permissions"], self.required_mask)
+        else:
+            claims = self.auth_service.get_token_claims(token)
+            user = await self.auth_service.load_user(claims["sub"])
+            allowed = has_permissions(user.get("role"), self.required_mask)
+
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions to access this resource",
+            )
         return user
 
     # def create_token(self, user_data: dict) -> str:
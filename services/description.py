@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+from typing import Any, AsyncIterator, Optional
+import redis.exceptions
+from fastapi import HTTPException
+from helpers.config import settings
+from helpers.metrics import metrics
+from helpers.circuit_breaker import BulkheadFullError, CircuitOpenError
+from helpers.n8n import SingletonN8nClient, n8n_breaker, n8n_bulkhead
+from helpers.redis import redis_client
+from helpers.singleflight import SingleFlight
+
+GENERATE_DESCRIPTION_PATH = "/webhook/generate-description"
+CACHE_KEY_PREFIX = "description"
+# report_id is unique per request and must not be part of the cache key
+CACHE_KEY_FIELDS = (
+    "category_name",
+    "district_name",
+    "village_name",
+    "description",
+    "location",
+)
+
+
+def _cache_hit_ratio() -> float:
+    hits = metrics.get("description_cache_hits")
+    total = hits + metrics.get("description_cache_misses")
+    return hits / total if total else 0.0
+
+
+metrics.register_gauge("description_cache_hit_ratio", _cache_hit_ratio)
+
+description_flight = SingleFlight(
+    namespace="description",
+    lock_ttl=settings.DESCRIPTION_SINGLEFLIGHT_LOCK_TTL,
+    wait_timeout=settings.DESCRIPTION_SINGLEFLIGHT_WAIT_TIMEOUT,
+)
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+class DescriptionService:
+    @staticmethod
+    def normalize_payload(request_payload: dict) -> dict:
+        """
+        Lowercase and collapse whitespace so near-identical inputs share a key.
+        """
+        return {
+            field: " ".join(str(request_payload.get(field) or "").lower().split())
+            for field in CACHE_KEY_FIELDS
+        }
+
+    @classmethod
+    def payload_digest(cls, request_payload: dict) -> str:
+        normalized = json.dumps(cls.normalize_payload(request_payload), sort_keys=True)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def cache_key(cls, request_payload: dict) -> str:
+        return f"{CACHE_KEY_PREFIX}:{cls.payload_digest(request_payload)}"
+
+    @staticmethod
+    def _with_report_id(result: Any, report_id: Optional[str]) -> Any:
+        """
+        Cached results were generated for another report, swap in the new report_id.
+        """
+        if isinstance(result, list):
+            return [
+                DescriptionService._with_report_id(item, report_id) for item in result
+            ]
+        if isinstance(result, dict) and "report_id" in result:
+            return {**result, "report_id": report_id}
+        return result
+
+    async def _get_cached(self, key: str) -> Optional[Any]:
+        try:
+            value = await redis_client.get(key)
+            return json.loads(value) if value is not None else None
+        except (redis.exceptions.RedisError, ValueError) as e:
+            logging.warning(f"Description cache read failed: {e}")
+            return None
+
+    async def _set_cached(self, key: str, result: Any) -> None:
+        try:
+            await redis_client.setex(
+                key, settings.DESCRIPTION_CACHE_TTL, json.dumps(result)
+            )
+        except (redis.exceptions.RedisError, TypeError) as e:
+            logging.warning(f"Description cache write failed: {e}")
+
+    async def _post_n8n(self, request_payload: dict) -> Any:
+        client = SingletonN8nClient.get_client()
+        response = await client.post(GENERATE_DESCRIPTION_PATH, json=request_payload)
+        if response.status_code != 200:
+            logging.error(
+                f"n8n generate-description failed: {response.status_code} - {response.text}"
+            )
+            raise HTTPException(
+                status_code=500, detail="Failed to generate description"
+            )
+        return response.json()
+
+    async def _call_n8n(self, request_payload: dict) -> Any:
+        try:
+            async with n8n_bulkhead.acquire():
+                return await n8n_breaker.call(lambda: self._post_n8n(request_payload))
+        except (CircuitOpenError, BulkheadFullError) as e:
+            logging.warning(f"n8n call rejected: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Description service is busy, please try again later",
+            )
+
+    async def generate(self, request_payload: dict) -> Any:
+        """
+        Generate a formal report description through the n8n webhook,
+        serving identical inputs from the Redis cache and coalescing
+        identical in-flight requests.
+        """
+        key = self.cache_key(request_payload)
+        report_id = request_payload.get("report_id")
+
+        if settings.DESCRIPTION_CACHE_TTL > 0:
+            cached = await self._get_cached(key)
+            if cached is not None:
+                metrics.inc("description_cache_hits")
+                return self._with_report_id(cached, report_id)
+            metrics.inc("description_cache_misses")
+
+        async def fetch() -> Any:
+            result = await self._call_n8n(request_payload)
+            if settings.DESCRIPTION_CACHE_TTL > 0:
+                await self._set_cached(key, result)
+            return result
+
+        # concurrent identical requests wait for a single n8n call
+        result = await description_flight.do(
+            self.payload_digest(request_payload), fetch
+        )
+        return self._with_report_id(result, report_id)
+
+    def is_available(self) -> bool:
+        return n8n_breaker.state != n8n_breaker.OPEN
+
+    async def stream(self, request_payload: dict) -> AsyncIterator[str]:
+        """
+        Stream the generated description from n8n as Server-Sent Events.
+        Upstream chunks are read only as fast as the client consumes them,
+        and closing this generator closes the upstream response.
+        """
+        report_id = request_payload.get("report_id")
+        if settings.DESCRIPTION_CACHE_TTL > 0:
+            cached = await self._get_cached(self.cache_key(request_payload))
+            if cached is not None:
+                metrics.inc("description_cache_hits")
+                yield format_sse(self._with_report_id(cached, report_id), "result")
+                yield format_sse({"report_id": report_id}, "done")
+                return
+            metrics.inc("description_cache_misses")
+
+        client = SingletonN8nClient.get_client()
+        try:
+            async with n8n_bulkhead.acquire(), n8n_breaker.protect():
+                async with client.stream(
+                    "POST", settings.N8N_DESCRIPTION_STREAM_PATH, json=request_payload
+                ) as response:
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        logging.error(
+                            f"n8n description stream failed: {response.status_code} - {body!r}"
+                        )
+                        raise HTTPException(
+                            status_code=500, detail="Failed to generate description"
+                        )
+
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        yield format_sse(
+                            {"content": self._chunk_content(line)}, "chunk"
+                        )
+        except (CircuitOpenError, BulkheadFullError) as e:
+            logging.warning(f"n8n stream rejected: {e}")
+            yield format_sse(
+                {"message": "Description service is busy, please try again later"},
+                "error",
+            )
+            return
+        except HTTPException as e:
+            yield format_sse({"message": e.detail}, "error")
+            return
+        except Exception as e:
+            logging.error(f"Error streaming description: {str(e)}")
+            yield format_sse({"message": "Failed to generate description"}, "error")
+            return
+
+        yield format_sse({"report_id": report_id}, "done")
+
+    @staticmethod
+    def _chunk_content(line: str) -> Any:
+        """
+        n8n streaming webhooks emit JSON lines such as {"type": "item", "content": "..."}
+        """
+        try:
+            chunk = json.loads(line)
+        except ValueError:
+            return line
+        if isinstance(chunk, dict) and "content" in chunk:
+            return chunk["content"]
+        return chunk
@@ -7,21 +7,17 @@ import requests
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import HTTPException
-from helpers.common import hash_password
 from helpers.google_auth import GoogleAuth
 from typing import List, Optional
 from models.users import User
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
 from sqlalchemy.future import select
 from helpers.redis import set_redis_value, get_redis_value, delete_redis_value
 from models.feedback_user import FeedbackUser
 from schemas.feedback_user import FeedbackUserRequest
 from schemas.users import UserCreate
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class FeedbackUserService:
     async def create_feedback_user(
@@ -0,0 +1,138 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from helpers.config import settings
+from models.notification_outbox import (
+    NotificationKind,
+    NotificationOutbox,
+    OutboxStatus,
+)
+
+
+class NotificationOutboxService:
+    def enqueue(
+        self, db: AsyncSession, kind: NotificationKind, payload: dict
+    ) -> NotificationOutbox:
+        """
+        Add a notification to the outbox without committing, so it is
+        committed (or rolled back) together with the state change.
+        """
+        notification = NotificationOutbox(kind=kind, payload=payload)
+        db.add(notification)
+        return notification
+
+    @staticmethod
+    def retry_delay(attempts: int) -> timedelta:
+        delay = settings.OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(delay, settings.OUTBOX_MAX_BACKOFF_SECONDS))
+
+    async def claim_batch(self, db: AsyncSession, limit: int) -> List[dict]:
+        """
+        Lease due notifications to this worker. A leased row becomes due
+        again after OUTBOX_LEASE_SECONDS, so a crash mid-send retries it.
+        """
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(NotificationOutbox)
+            .where(
+                NotificationOutbox.status == OutboxStatus.pending,
+                NotificationOutbox.next_attempt_at <= now,
+            )
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        notifications = result.scalars().all()
+        lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        for notification in notifications:
+            notification.attempts += 1
+            notification.next_attempt_at = lease_until
+        await db.commit()
+        return [notification.to_dict() for notification in notifications]
+
+    async def mark_sent(self, db: AsyncSession, notification_ids: List[str]) -> None:
+        if not notification_ids:
+            return
+        await db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(notification_ids))
+            .values(status=OutboxStatus.sent, last_error=None)
+        )
+        await db.commit()
+
+    async def mark_skipped(
+        self, db: AsyncSession, notification: dict, reason: str
+    ) -> None:
+        await db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == notification["id"])
+            .values(status=OutboxStatus.skipped, last_error=reason[:500])
+        )
+        await db.commit()
+
+    async def mark_failed(
+        self, db: AsyncSession, notification: dict, error: str
+    ) -> OutboxStatus:
+        """
+        Schedule a retry with exponential backoff, or move the notification
+        to the dead-letter state once it ran out of attempts.
+        """
+        attempts = notification["attempts"]
+        if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            status = OutboxStatus.dead
+            next_attempt_at = datetime.now(timezone.utc)
+            logging.error(
+                f"[outbox] {notification['kind']} {notification['id']} dead after {attempts} attempts: {error}"
+            )
+        else:
+            status = OutboxStatus.pending
+            next_attempt_at = datetime.now(timezone.utc) + self.retry_delay(attempts)
+
+        await db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == notification["id"])
+            .values(
+                status=status,
+                next_attempt_at=next_attempt_at,
+                last_error=error[:500],
+            )
+        )
+        await db.commit()
+        return status
+
+    async def queue_depth(self, db: AsyncSession) -> dict:
+        result = await db.execute(
+            select(
+                NotificationOutbox.status,
+                func.count(NotificationOutbox.id),
+                func.min(NotificationOutbox.created_at),
+            ).group_by(NotificationOutbox.status)
+        )
+        depth = {status.value: 0 for status in OutboxStatus}
+        oldest_pending: Optional[datetime] = None
+        for status, count, oldest in result.all():
+            depth[OutboxStatus(status).value] = count
+            if status == OutboxStatus.pending:
+                oldest_pending = oldest
+
+        depth["oldest_pending_age_seconds"] = (
+            (datetime.now(timezone.utc) - oldest_pending).total_seconds()
+            if oldest_pending
+            else 0.0
+        )
+        return depth
+
+    async def purge_sent(self, db: AsyncSession, older_than: datetime) -> int:
+        result = await db.execute(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status.in_(
+                    [OutboxStatus.sent, OutboxStatus.skipped]
+                ),
+                NotificationOutbox.updated_at < older_than,
+            )
+        )
+        await db.commit()
+        return result.rowcount or 0
@@ -1,3 +1,4 @@
+import asyncio
 import dis
 import logging
 import os
@@ -30,6 +31,9 @@ from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from helpers.config import settings
 
+# Google Drive batch requests accept at most 100 calls
+DRIVE_BATCH_LIMIT = 100
+
 
 class ReportService:
     async def get_all_categories(self, db: AsyncSession) -> List[dict]:
@@ -302,6 +306,60 @@ class ReportService:
             logging.error(f"Error uploading file to Google Drive: {str(e)}")
             raise Exception(f"Failed to upload file: {str(e)}")
 
+    async def list_google_drive_files(self, folder_id: str) -> List[dict]:
+        """
+        List all non-trashed files in a Google Drive folder, following pagination.
+        """
+        try:
+            credentials = self._get_google_credentials()
+            service = build("drive", "v3", credentials=credentials)
+
+            files = []
+            page_token = None
+            while True:
+                request = service.files().list(
+                    q=f"'{folder_id}' in parents and trashed = false",
+                    fields="nextPageToken, files(id, name, webContentLink, createdTime)",
+                    pageSize=1000,
+                    pageToken=page_token,
+                )
+                response = await asyncio.to_thread(request.execute)
+                files.extend(response.get("files", []))
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    return files
+        except HttpError as e:
+            logging.error(f"Google Drive API error: {e}")
+            raise Exception(f"Google Drive API error: {str(e)}")
+
+    async def delete_google_drive_files(self, file_ids: List[str]) -> List[str]:
+        """
+        Delete files from Google Drive using a single batch HTTP request.
+        Returns the IDs that were deleted successfully.
+        """
+        if len(file_ids) > DRIVE_BATCH_LIMIT:
+            raise ValueError(
+                f"Cannot delete more than {DRIVE_BATCH_LIMIT} files per batch"
+            )
+
+        credentials = self._get_google_credentials()
+        service = build("drive", "v3", credentials=credentials)
+        deleted = []
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                logging.error(f"Failed to delete Drive file {request_id}: {exception}")
+                return
+            deleted.append(request_id)
+
+        batch = service.new_batch_http_request(callback=_callback)
+        for file_id in file_ids:
+            batch.add(service.files().delete(fileId=file_id), request_id=file_id)
+        await asyncio.to_thread(batch.execute)
+
+        logging.info(f"Deleted {len(deleted)} files from Google Drive")
+        return deleted
+
     def _get_google_credentials(self):
         """
         Get Google API credentials from service account JSON file.
@@ -7,21 +7,22 @@ import requests
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import HTTPException, File
-from helpers.common import hash_password
+from helpers.common import (
+    hash_password_async,
+    verify_and_update_password_async,
+    verify_password_async,
+)
 from helpers.google_auth import GoogleAuth
 from typing import List, Optional
 from models.users import User
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
 from sqlalchemy.future import select
 from helpers.redis import set_redis_value, get_redis_value, delete_redis_value
 from helpers.cloudinary import upload_image, delete_image
 
 from schemas.users import UserCreate
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class UserService:
     async def get_user(self, db: AsyncSession, user_id: str) -> dict:
@@ -67,22 +68,56 @@ class UserService:
                 status_code=500, detail=f"Failed to get users: {str(e)}"
             )
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         try:
-            print(f"Verifying password: {plain_password} against {hashed_password}")
-            return pwd_context.verify(plain_password, hashed_password)
+            return await verify_password_async(plain_password, hashed_password)
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error verifying password: {str(e)}")
             raise HTTPException(
                 status_code=500, detail=f"Failed to verify password: {str(e)}"
             )
 
+    async def check_password(
+        self, db: AsyncSession, user: dict, plain_password: str
+    ) -> bool:
+        """
+        Verify the user's password and transparently rehash it when it was
+        stored with another bcrypt cost than BCRYPT_ROUNDS.
+        """
+        try:
+            verified, new_hash = await verify_and_update_password_async(
+                plain_password, user["password"]
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logging.error(f"Error verifying password: {str(e)}")
+            raise HTTPException(
+                status_code=500, detail=f"Failed to verify password: {str(e)}"
+            )
+
+        if verified and new_hash:
+            try:
+                result = await db.execute(select(User).where(User.id == user["id"]))
+                user_model = result.scalars().first()
+                if user_model and user_model.password == user["password"]:
+                    user_model.password = new_hash
+                    await db.commit()
+                    logging.info(f"Password hash upgraded for user {user['id']}")
+            except Exception as e:
+                # the login itself succeeded, try again next time
+                logging.warning(f"Failed to upgrade password hash: {str(e)}")
+                await db.rollback()
+        return verified
+
     async def create_user(self, db: AsyncSession, user_data: dict) -> dict:
         try:
             logging.info(f"Creating user with data: {user_data}")
             password = user_data.get("password")
             if password:
-                hashed_password = hash_password(password)
+                hashed_password = await hash_password_async(password)
                 is_verified = False
             else:
                 hashed_password = None
@@ -108,6 +143,9 @@ class UserService:
             await db.refresh(user)
             user_dict = user.to_dict()
             return user_dict
+        except HTTPException:
+            await db.rollback()
+            raise
         except Exception as e:
             logging.error(f"Error creating user: {str(e)}")
             await db.rollback()
@@ -137,7 +175,7 @@ class UserService:
             for field, value in update_data.items():
                 if field == "password" and value:
                     # Hash new password
-                    value = pwd_context.hash(value)
+                    value = await hash_password_async(value)
                 if field in allowed_fields and value is not None:
                     setattr(user, field, value)
 
@@ -0,0 +1,49 @@
+"""
+Bearer token verification cost: python-jose decoding the token on every
+call (the previous behaviour) against the verified-token LRU cache.
+
+    python tests/benchmarks/bench_jwt_cache.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+
+from jose import jwt
+
+from helpers.jwt import JwtHelper
+
+helper = JwtHelper()
+TOKEN = helper.create_token(
+    {
+        "id": "ckx0000000000000000000000",
+        "email": "warga@example.com",
+        "name": "Warga Contoh",
+        "image_url": "https://res.cloudinary.com/demo/image/upload/v1/avatar.png",
+        "is_verified": True,
+        "role": "user",
+    }
+)
+
+
+def main(iterations: int) -> None:
+    uncached = timeit.timeit(
+        lambda: jwt.decode(TOKEN, helper.secret_key, algorithms=["HS256"]),
+        number=iterations,
+    )
+    cached = timeit.timeit(lambda: helper.decode(TOKEN), number=iterations)
+    for name, seconds in (("jose", uncached), ("cached", cached)):
+        print(
+            f"{name:>6}: {iterations / seconds:10,.0f} decodes/s "
+            f"({seconds / iterations * 1e6:6.1f} us/decode)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
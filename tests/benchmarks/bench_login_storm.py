@@ -0,0 +1,90 @@
+"""
+Latency of an unrelated endpoint during a login storm, with bcrypt running
+on the event loop (the previous behaviour) against the password worker pool.
+
+    python tests/benchmarks/bench_login_storm.py [logins]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+import httpx
+from fastapi import FastAPI
+
+from helpers.common import hash_password, verify_password, verify_password_async
+
+PASSWORD = "correct horse battery staple"
+HASHED = hash_password(PASSWORD)
+PING_INTERVAL = 0.01
+
+app = FastAPI()
+
+
+@app.post("/login/inline")
+async def login_inline():
+    return {"ok": verify_password(PASSWORD, HASHED)}
+
+
+@app.post("/login/pool")
+async def login_pool():
+    return {"ok": await verify_password_async(PASSWORD, HASHED)}
+
+
+@app.get("/ping")
+async def ping():
+    return {}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def storm(client: httpx.AsyncClient, mode: str, logins: int) -> list:
+    latencies = []
+    done = asyncio.Event()
+
+    async def pinger():
+        # measured from when the ping was due, so time spent waiting for a
+        # blocked event loop counts against the endpoint
+        due = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await client.get("/ping")
+            latencies.append((time.perf_counter() - due) * 1000)
+            due = max(due + PING_INTERVAL, time.perf_counter())
+
+    async def logins_burst():
+        await asyncio.gather(*(client.post(f"/login/{mode}") for _ in range(logins)))
+        done.set()
+
+    await asyncio.gather(pinger(), logins_burst())
+    return latencies
+
+
+async def main(logins: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for mode in ("inline", "pool"):
+            started = time.perf_counter()
+            latencies = await storm(client, mode, logins)
+            elapsed = time.perf_counter() - started
+            print(
+                f"{mode:>6}: {logins} logins in {elapsed:5.2f}s, /ping "
+                f"p50 {statistics.median(latencies):7.1f} ms, "
+                f"p99 {percentile(latencies, 99):7.1f} ms, "
+                f"max {max(latencies):7.1f} ms ({len(latencies)} samples)"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 16))
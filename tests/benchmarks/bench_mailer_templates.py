@@ -0,0 +1,55 @@
+"""
+Email template rendering throughput: compiling the template on every email
+(the previous behaviour) against the shared, precompiled environment.
+
+    python tests/benchmarks/bench_mailer_templates.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from jinja2 import Template
+
+from helpers.mailer import (
+    TEMPLATES_DIR,
+    render_status_report_template,
+    warm_template_cache,
+)
+
+CONTEXT = {
+    "report_id": "ckx0000000000000000000000",
+    "category_name": "Infrastruktur Rusak",
+    "status": "Dalam Proses",
+    "updated_at": "2025-01-10 08:00:00",
+    "feedback": "Laporan sedang ditindaklanjuti oleh dinas terkait.",
+}
+
+
+def render_uncached() -> str:
+    with open(TEMPLATES_DIR / "status_report_email.html", "r") as file:
+        return Template(file.read()).render(**CONTEXT)
+
+
+def render_cached() -> str:
+    return render_status_report_template(**CONTEXT)
+
+
+def main(iterations: int) -> None:
+    warm_template_cache()
+    assert render_uncached() == render_cached()
+
+    for name, func in (("uncached", render_uncached), ("cached", render_cached)):
+        seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+        print(
+            f"{name:>9}: {iterations / seconds:10.0f} renders/s "
+            f"({seconds / iterations * 1e6:8.1f} us/render)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,75 @@
+"""
+Permission check cost on the request hot path: rebuilding the role's
+permission list per request (the previous behaviour) against the interned
+frozensets and per-role bitmasks.
+
+    python tests/benchmarks/bench_permissions.py [iterations]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from permissions.model_permission import Reports, Users
+from permissions.roles import (
+    ROLE_PERMISSIONS,
+    Role,
+    get_role_permissions,
+    has_permissions,
+    permission_mask,
+)
+
+REQUIRED = [
+    Users.permissions.READ,
+    Users.permissions.UPDATE,
+    Reports.permissions.DELETE,
+]
+
+
+def full_name(permission):
+    model_name = re.sub(
+        r"(?<!^)(?=[A-Z])", "_", permission.permission_model.__name__
+    ).upper()
+    return f"{model_name}_{permission.permission_type.__str__().upper()}"
+
+
+def list_check(role):
+    for permission_required in REQUIRED:
+        permissions = set()
+        for permissions_group in ROLE_PERMISSIONS[role]:
+            for permission in permissions_group:
+                permissions.add(full_name(permission))
+        if full_name(permission_required) not in list(permissions):
+            return False
+    return True
+
+
+def set_check(role):
+    permissions = get_role_permissions(role)
+    return all(permission in permissions for permission in REQUIRED)
+
+
+REQUIRED_MASK = permission_mask(REQUIRED)
+
+
+def mask_check(role):
+    return has_permissions(role, REQUIRED_MASK)
+
+
+def main(iterations: int) -> None:
+    for name, check in (("list", list_check), ("set", set_check), ("mask", mask_check)):
+        assert check(Role.ADMINISTRATOR)
+        seconds = timeit.timeit(lambda: check(Role.ADMINISTRATOR), number=iterations)
+        print(
+            f"{name:>5}: {iterations / seconds:12,.0f} checks/s "
+            f"({seconds / iterations * 1e9:8.0f} ns/check)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,38 @@
+"""
+Login storm against a running instance, watch the latency of the
+unrelated endpoint in the locust report.
+
+    LOCUST_EMAIL=... LOCUST_PASSWORD=... LOCUST_TOKEN=... \
+        locust -f tests/locustfile.py --host http://localhost:8000
+"""
+
+import os
+
+from locust import HttpUser, between, task
+
+
+class LoginStormUser(HttpUser):
+    wait_time = between(0.1, 0.5)
+
+    @task(3)
+    def login(self):
+        self.client.post(
+            "/v1/auth/login",
+            json={
+                "email": os.getenv("LOCUST_EMAIL", "user@example.com"),
+                "password": os.getenv("LOCUST_PASSWORD", "password"),
+            },
+            name="login",
+        )
+
+
+class BrowsingUser(HttpUser):
+    wait_time = between(0.5, 1)
+
+    @task
+    def categories(self):
+        self.client.get(
+            "/v1/reports/category",
+            headers={"Authorization": f"Bearer {os.getenv('LOCUST_TOKEN', '')}"},
+            name="unrelated: categories",
+        )
@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from helpers.circuit_breaker import (
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+async def fail():
+    raise TimeoutError("n8n timed out")
+
+
+async def succeed():
+    return "ok"
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+
+
+@pytest.mark.asyncio
+async def test_breaker_half_opens_and_closes_on_successful_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    with patch("helpers.circuit_breaker.time.monotonic", return_value=100.0):
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+
+    with patch("helpers.circuit_breaker.time.monotonic", return_value=131.0):
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert await breaker.call(succeed) == "ok"
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_breaker_reopens_on_failed_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    with patch("helpers.circuit_breaker.time.monotonic", return_value=100.0):
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+
+    with patch("helpers.circuit_breaker.time.monotonic", return_value=131.0):
+        with pytest.raises(TimeoutError):
+            await breaker.call(fail)
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejects_when_full():
+    bulkhead = Bulkhead("test", max_concurrent=1, max_wait=0.01)
+    entered = asyncio.Event()
+    release = asyncio.Event()
+
+    async def hold():
+        async with bulkhead.acquire():
+            entered.set()
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await entered.wait()
+
+    with pytest.raises(BulkheadFullError):
+        async with bulkhead.acquire():
+            pass
+
+    release.set()
+    await holder
+    async with bulkhead.acquire():
+        assert bulkhead.stats()["active"] == 1
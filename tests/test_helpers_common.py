@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from helpers import common
+
+
+@pytest.mark.asyncio
+async def test_password_jobs_run_off_the_event_loop():
+    loop_thread = threading.get_ident()
+
+    def job():
+        return threading.get_ident()
+
+    assert await common._run_password_job(job) != loop_thread
+
+
+@pytest.mark.asyncio
+async def test_password_jobs_beyond_the_queue_limit_are_rejected():
+    release = threading.Event()
+
+    with patch.object(common.settings, "PASSWORD_HASH_WORKERS", 1), patch.object(
+        common.settings, "PASSWORD_HASH_MAX_QUEUE", 1
+    ):
+        running = [
+            asyncio.ensure_future(common._run_password_job(release.wait))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as error:
+            await common._run_password_job(release.wait)
+
+        release.set()
+        await asyncio.gather(*running)
+
+    assert error.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_cancelled_password_job_counts_until_its_thread_finishes():
+    release = threading.Event()
+    pending = common._password_jobs
+
+    job = asyncio.ensure_future(common._run_password_job(release.wait))
+    await asyncio.sleep(0)
+    job.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await job
+
+    # the worker thread is still busy with the cancelled request
+    assert common._password_jobs == pending + 1
+
+    release.set()
+    for _ in range(100):
+        if common._password_jobs == pending:
+            break
+        await asyncio.sleep(0.01)
+    assert common._password_jobs == pending
+
+
+def test_hashes_with_another_cost_are_upgraded():
+    context = CryptContext(
+        schemes=["bcrypt"], bcrypt__rounds=5, bcrypt__min_rounds=5, bcrypt__max_rounds=5
+    )
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+
+    with patch.object(common, "pwd_context", context):
+        verified, new_hash = common.verify_and_update_password("secret", old_hash)
+        assert verified
+        assert new_hash is not None and "$05$" in new_hash
+        assert common.verify_and_update_password("secret", new_hash) == (True, None)
+        assert common.verify_and_update_password("wrong", old_hash) == (False, None)
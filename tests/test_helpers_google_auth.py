@@ -0,0 +1,168 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from helpers.google_auth import GoogleAuth, GoogleOAuthClient, google_jwks
+from services.auth import AuthService
+
+CLIENT_ID = "client-id.apps.googleusercontent.com"
+SIGNING_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+PRIVATE_PEM = SIGNING_KEY.private_bytes(
+    serialization.Encoding.PEM,
+    serialization.PrivateFormat.PKCS8,
+    serialization.NoEncryption(),
+)
+PUBLIC_JWK = {
+    **jwk.construct(
+        SIGNING_KEY.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ),
+        "RS256",
+    ).to_dict(),
+    "kid": "local-key",
+}
+
+
+class FakeResponse:
+    def __init__(self, status, body=""):
+        self.status = status
+        self._body = body
+
+    async def text(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def id_token(key=PRIVATE_PEM, **overrides):
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "sub": "google-1",
+        "email": "warga@example.com",
+        "email_verified": True,
+        "name": "Warga",
+        "picture": "https://example.com/a.png",
+        "exp": int(time.time()) + 600,
+        **overrides,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": "local-key"})
+
+
+async def local_key(kid):
+    if kid != PUBLIC_JWK["kid"]:
+        raise AssertionError(kid)
+    return PUBLIC_JWK
+
+
+@pytest.fixture(autouse=True)
+def google_client():
+    with patch.object(GoogleAuth, "GOOGLE_CLIENT_ID", CLIENT_ID), patch.object(
+        GoogleOAuthClient, "_backoff", return_value=0
+    ), patch.object(google_jwks, "get_key", side_effect=local_key):
+        yield
+
+
+def with_session(session):
+    return patch(
+        "helpers.google_auth.SingletonAiohttp.get_aiohttp_client", return_value=session
+    )
+
+
+@pytest.mark.asyncio
+async def test_identity_is_read_from_id_token_without_userinfo_call():
+    session = FakeSession(
+        [FakeResponse(200, f'{{"access_token": "at", "id_token": "{id_token()}"}}')]
+    )
+
+    with with_session(session):
+        user_info = await AuthService().authenticate_with_google("code", None)
+
+    assert user_info["email"] == "warga@example.com"
+    assert user_info["picture"] == "https://example.com/a.png"
+    assert [method for method, _ in session.calls] == ["POST"]
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_userinfo_when_id_token_is_for_another_client():
+    session = FakeSession(
+        [
+            FakeResponse(
+                200, f'{{"access_token": "at", "id_token": "{id_token(aud="other")}"}}'
+            ),
+            FakeResponse(200, '{"email": "warga@example.com", "name": "Warga"}'),
+        ]
+    )
+
+    with with_session(session):
+        user_info = await AuthService().authenticate_with_google("code", None)
+
+    assert user_info["email"] == "warga@example.com"
+    assert [method for method, _ in session.calls] == ["POST", "GET"]
+
+
+@pytest.mark.asyncio
+async def test_id_token_with_forged_signature_is_not_trusted():
+    forged_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    forged = id_token(
+        key=forged_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ),
+        email="admin@example.com",
+    )
+
+    assert await GoogleOAuthClient.userinfo_from_id_token(forged) is None
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried():
+    session = FakeSession(
+        [
+            asyncio.TimeoutError(),
+            FakeResponse(503, "unavailable"),
+            FakeResponse(200, '{"access_token": "at"}'),
+        ]
+    )
+
+    with with_session(session):
+        tokens = await GoogleOAuthClient.exchange_code("code", "https://app/cb")
+
+    assert tokens == {"access_token": "at"}
+    assert len(session.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_rejected_code_is_not_retried():
+    session = FakeSession([FakeResponse(400, '{"error": "invalid_grant"}')])
+
+    with with_session(session), pytest.raises(HTTPException) as exc:
+        await GoogleOAuthClient.exchange_code("code", "https://app/cb")
+
+    assert exc.value.status_code == 400
+    assert len(session.calls) == 1
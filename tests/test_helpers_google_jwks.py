@@ -0,0 +1,129 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+
+from helpers import google_jwks as jwks_module
+from helpers.google_jwks import JwksCache, JwksUnavailable, parse_max_age
+
+
+def rsa_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid, "use": "sig"}
+
+
+class FakeResponse:
+    def __init__(self, status, body, cache_control=None):
+        self.status = status
+        self._body = body
+        self.headers = {"Cache-Control": cache_control} if cache_control else {}
+
+    async def text(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class LocalJwks:
+    """
+    Stand-in for Google's certs endpoint serving locally generated keys
+    """
+
+    def __init__(self, *kids, max_age=3600):
+        self.keys = [rsa_jwk(kid) for kid in kids]
+        self.max_age = max_age
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        return FakeResponse(
+            200,
+            json.dumps({"keys": self.keys}),
+            f"public, max-age={self.max_age}, must-revalidate",
+        )
+
+
+@pytest.fixture
+def fake_redis():
+    store = {}
+
+    async def get(key):
+        return store.get(key)
+
+    async def set(key, value, ex=None):
+        store[key] = value
+
+    with patch.object(jwks_module.redis_client, "get", side_effect=get), patch.object(
+        jwks_module.redis_client, "set", side_effect=set
+    ):
+        yield store
+
+
+def serve(jwks):
+    return patch(
+        "helpers.google_jwks.SingletonAiohttp.get_aiohttp_client", return_value=jwks
+    )
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=19833, must-revalidate") == 19833
+    assert parse_max_age(None) == 3600
+
+
+@pytest.mark.asyncio
+async def test_keys_are_fetched_once_and_shared_through_redis(fake_redis):
+    jwks = LocalJwks("key-1", "key-2", max_age=120)
+    cache = JwksCache("https://certs", "test:jwks")
+
+    with serve(jwks):
+        assert (await cache.get_key("key-1"))["kid"] == "key-1"
+        assert (await cache.get_key("key-2"))["kid"] == "key-2"
+
+        other_worker = JwksCache("https://certs", "test:jwks")
+        assert (await other_worker.get_key("key-1"))["kid"] == "key-1"
+
+    assert jwks.requests == 1
+    assert 110 < cache.expires_in() <= 120
+    assert json.loads(fake_redis["test:jwks"])["jwks"]["keys"] == jwks.keys
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetches_rotated_keys(fake_redis):
+    jwks = LocalJwks("key-1")
+    cache = JwksCache("https://certs", "test:jwks")
+
+    with serve(jwks):
+        await cache.get_key("key-1")
+        jwks.keys.append(rsa_jwk("key-2"))
+        cache._last_fetch = time.time() - 3600
+
+        assert (await cache.get_key("key-2"))["kid"] == "key-2"
+        with pytest.raises(JwksUnavailable):
+            await cache.get_key("key-3")
+
+    # the second unknown kid is inside the minimum refresh interval
+    assert jwks.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_renews_keys_close_to_expiry(fake_redis):
+    jwks = LocalJwks("key-1", max_age=300)
+    cache = JwksCache("https://certs", "test:jwks")
+
+    with serve(jwks):
+        await cache.refresh(min_ttl=600)
+        await cache.refresh(min_ttl=60)
+        await cache.refresh(min_ttl=600)
+
+    assert jwks.requests == 2
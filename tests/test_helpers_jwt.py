@@ -0,0 +1,112 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from jose import JWTError, jwt
+
+from helpers import jwt as jwt_module
+from helpers.jwt import JwtHelper, TokenCache, normalize_claims, token_cache
+from helpers.metrics import metrics
+from permissions.roles import ROLE_PERMISSION_MASKS
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def test_repeated_decode_is_served_from_cache():
+    helper = JwtHelper()
+    token = helper.create_token({"id": "user-1", "role": "user"})
+    hits = metrics.get("jwt_cache_hits")
+
+    with patch.object(jwt_module.jwt, "decode", wraps=jwt.decode) as decode:
+        first = helper.decode(token)
+        second = helper.decode(token)
+
+    assert first == second
+    assert first is not second
+    decode.assert_called_once()
+    assert metrics.get("jwt_cache_hits") == hits + 1
+
+
+def test_tampered_token_is_not_served_from_cache():
+    helper = JwtHelper()
+    token = helper.create_token({"id": "user-1", "role": "user"})
+    helper.decode(token)
+
+    with pytest.raises(JWTError):
+        helper.decode(token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+
+
+def test_expired_entries_are_not_served():
+    cache = TokenCache(max_size=10)
+    cache.set(b"expired", {"sub": "user-1", "exp": time.time() - 1})
+    cache.set(b"valid", {"sub": "user-1", "exp": time.time() + 60})
+
+    assert cache.get(b"expired") is None
+    assert cache.get(b"valid")["sub"] == "user-1"
+    assert cache.stats()["size"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    exp = time.time() + 60
+    cache.set(b"a", {"exp": exp})
+    cache.set(b"b", {"exp": exp})
+    cache.get(b"a")
+    cache.set(b"c", {"exp": exp})
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
+    assert cache.get(b"c") is not None
+
+
+def test_tokens_without_exp_are_not_cached():
+    cache = TokenCache(max_size=2)
+    cache.set(b"a", {"sub": "user-1"})
+
+    assert cache.get(b"a") is None
+
+
+def test_access_token_uses_compact_claims():
+    helper = JwtHelper()
+    token = helper.create_token(
+        {
+            "id": "user-1",
+            "email": "a@b.co",
+            "name": "Warga",
+            "image_url": "https://example.com/" + "a" * 500,
+            "is_verified": True,
+            "role": "admin",
+        }
+    )
+    raw = jwt.get_unverified_claims(token)
+
+    assert set(raw) == {"sub", "rl", "vf", "pm", "pv", "iat", "exp"}
+    assert raw["pm"] == ROLE_PERMISSION_MASKS["admin"]
+
+    claims = helper.decode(token)
+    assert claims["role"] == "admin"
+    assert claims["is_verified"] is True
+    assert claims["permissions"] == ROLE_PERMISSION_MASKS["admin"]
+
+
+def test_legacy_tokens_are_normalized():
+    claims = normalize_claims(
+        {"sub": "user-1", "email": "a@b.co", "role": "user", "is_verified": True}
+    )
+
+    assert claims["role"] == "user"
+    assert claims["is_verified"] is True
+    assert claims["permissions"] == ROLE_PERMISSION_MASKS["user"]
+
+
+def test_mask_from_other_permission_bits_is_recomputed_from_role():
+    claims = normalize_claims(
+        {"sub": "user-1", "rl": "user", "pm": ROLE_PERMISSION_MASKS["admin"], "pv": -1}
+    )
+
+    assert claims["permissions"] == ROLE_PERMISSION_MASKS["user"]
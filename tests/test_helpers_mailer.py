@@ -0,0 +1,24 @@
+from unittest.mock import patch
+
+from helpers import mailer
+
+
+def test_render_otp_template_includes_code():
+    html = mailer.render_otp_template("123456")
+
+    assert "123456" in html
+
+
+def test_templates_are_compiled_once():
+    mailer.warm_template_cache()
+
+    with patch.object(
+        mailer.template_env, "_parse", side_effect=AssertionError("recompiled")
+    ):
+        mailer.render_status_report_template(
+            report_id="report-1",
+            category_name="Lingkungan",
+            status="Selesai",
+            updated_at="2025-01-10 08:00:00",
+            feedback="Terima kasih",
+        )
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from helpers.n8n import SingletonN8nClient
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_of_a_fresh_client():
+    with patch.object(SingletonN8nClient, "client", None):
+        SingletonN8nClient.get_client()
+        try:
+            stats = SingletonN8nClient.pool_stats()
+        finally:
+            await SingletonN8nClient.close_client()
+
+    assert stats["open"] == 0
+    assert stats["waiting"] == 0
+
+
+def test_pool_stats_survive_changed_httpx_internals():
+    client = SimpleNamespace(_transport=SimpleNamespace())
+
+    with patch.object(SingletonN8nClient, "client", client):
+        assert SingletonN8nClient.pool_stats() == {}
@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from helpers.metrics import metrics
+from helpers.onesignal import OneSignalClient, OneSignalError
+
+
+class FakeResponse:
+    def __init__(self, status, body=""):
+        self.status = status
+        self._body = body
+
+    async def text(self):
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(dict(kwargs["json"]))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def no_backoff():
+    with patch.object(OneSignalClient, "_backoff", return_value=0):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_send_email_retries_transient_failures(no_backoff):
+    session = FakeSession(
+        [
+            asyncio.TimeoutError(),
+            FakeResponse(503, "unavailable"),
+            FakeResponse(200, '{"id": "notification-1"}'),
+        ]
+    )
+    before = metrics.snapshot()["timings"].get("onesignal_request_seconds", {})
+
+    with patch(
+        "helpers.onesignal.SingletonAiohttp.get_aiohttp_client", return_value=session
+    ):
+        result = await OneSignalClient.send_email(["a@b.co"], "Subject", "<p>Hi</p>")
+
+    assert result == {"id": "notification-1"}
+    assert len(session.calls) == 3
+    assert session.calls[0]["include_email_tokens"] == ["a@b.co"]
+    timing = metrics.snapshot()["timings"]["onesignal_request_seconds"]
+    assert timing["count"] == before.get("count", 0) + 3
+
+
+@pytest.mark.asyncio
+async def test_retries_reuse_the_idempotency_key(no_backoff):
+    session = FakeSession(
+        [
+            asyncio.TimeoutError(),
+            FakeResponse(502),
+            FakeResponse(200, "{}"),
+            FakeResponse(200, "{}"),
+        ]
+    )
+
+    with patch(
+        "helpers.onesignal.SingletonAiohttp.get_aiohttp_client", return_value=session
+    ):
+        await OneSignalClient.send_email(["a@b.co"], "Subject", "<p>Hi</p>")
+        await OneSignalClient.send_email(
+            ["a@b.co"], "Subject", "<p>Hi</p>", idempotency_key="outbox-key"
+        )
+
+    keys = [call["idempotency_key"] for call in session.calls]
+    assert keys[0]
+    assert keys[:3] == [keys[0]] * 3
+    assert keys[3] == "outbox-key"
+
+
+@pytest.mark.asyncio
+async def test_send_email_does_not_retry_client_errors(no_backoff):
+    session = FakeSession([FakeResponse(400, "invalid app_id")])
+
+    with patch(
+        "helpers.onesignal.SingletonAiohttp.get_aiohttp_client", return_value=session
+    ), pytest.raises(OneSignalError, match="400"):
+        await OneSignalClient.send_email(["a@b.co"], "Subject", "<p>Hi</p>")
+
+    assert len(session.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_send_email_gives_up_after_max_retries(no_backoff):
+    session = FakeSession([FakeResponse(500, "error")] * 3)
+
+    with patch(
+        "helpers.onesignal.SingletonAiohttp.get_aiohttp_client", return_value=session
+    ), patch("helpers.onesignal.settings.ONESIGNAL_MAX_RETRIES", 2), pytest.raises(
+        OneSignalError
+    ):
+        await OneSignalClient.send_email(["a@b.co"], "Subject", "<p>Hi</p>")
+
+    assert len(session.calls) == 3
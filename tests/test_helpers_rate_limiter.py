@@ -0,0 +1,195 @@
+import asyncio
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+import redis.exceptions
+from starlette.requests import Request
+
+from helpers import rate_limiter as rate_limiter_module
+from helpers.config import settings
+from helpers.metrics import metrics
+from helpers.rate_limiter import (
+    RESERVE_LOGIN_ATTEMPT_SCRIPT,
+    LoginThrottle,
+    client_ip,
+)
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def fake_redis():
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch.object(rate_limiter_module, "redis_client", fake), patch.object(
+        rate_limiter_module,
+        "reserve_login_attempt_script",
+        fake.register_script(RESERVE_LOGIN_ATTEMPT_SCRIPT),
+    ):
+        yield fake
+
+
+@pytest.fixture
+def clock():
+    with patch.object(rate_limiter_module.time, "time", return_value=NOW) as now:
+        yield now
+
+
+async def fail_login(throttle, email, ip):
+    wait, attempt = await throttle.reserve(email, ip)
+    if attempt:
+        throttle.record_failure()
+    return wait
+
+
+@pytest.mark.asyncio
+async def test_free_attempts_have_no_delay(fake_redis, clock):
+    throttle = LoginThrottle()
+
+    for _ in range(settings.LOGIN_THROTTLE_FREE_ATTEMPTS):
+        assert await fail_login(throttle, "warga@example.com", None) == 0
+
+
+@pytest.mark.asyncio
+async def test_delay_doubles_after_free_attempts(fake_redis, clock):
+    throttle = LoginThrottle()
+    base = settings.LOGIN_THROTTLE_BASE_DELAY
+    for _ in range(settings.LOGIN_THROTTLE_FREE_ATTEMPTS):
+        await fail_login(throttle, "warga@example.com", None)
+
+    assert await fail_login(throttle, "warga@example.com", None) == base
+
+    clock.return_value = NOW + base
+    assert await fail_login(throttle, "warga@example.com", None) == 0
+    assert await fail_login(throttle, "warga@example.com", None) == base * 2
+
+
+@pytest.mark.asyncio
+async def test_failures_throttle_the_account_until_login_succeeds(fake_redis, clock):
+    throttle = LoginThrottle()
+    blocked = metrics.get("login_throttle_blocked")
+
+    for _ in range(settings.LOGIN_THROTTLE_FREE_ATTEMPTS):
+        assert await fail_login(throttle, "Warga@Example.com", "10.0.0.1") == 0
+
+    wait, attempt = await throttle.reserve("warga@example.com", "10.0.0.2")
+    assert wait > 0 and attempt is None
+    assert metrics.get("login_throttle_blocked") == blocked + 1
+
+    await throttle.release("warga@example.com", None, None)
+    wait, attempt = await throttle.reserve("warga@example.com", "10.0.0.2")
+    assert wait == 0 and attempt
+
+
+@pytest.mark.asyncio
+async def test_successful_login_takes_its_attempt_back_from_the_ip(fake_redis, clock):
+    throttle = LoginThrottle()
+    await fail_login(throttle, "other@example.com", "10.0.0.1")
+
+    _, attempt = await throttle.reserve("warga@example.com", "10.0.0.1")
+    await throttle.release("warga@example.com", "10.0.0.1", attempt)
+
+    assert await fake_redis.zcard("login:fail:ip:10.0.0.1") == 1
+
+
+@pytest.mark.asyncio
+async def test_lockout_lasts_until_failures_leave_the_window(fake_redis, clock):
+    throttle = LoginThrottle()
+    lockouts = metrics.get("login_throttle_lockouts")
+    window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+    for i in range(settings.LOGIN_THROTTLE_EMAIL_LOCKOUT):
+        # spaced past every delay so each attempt is let through
+        clock.return_value = NOW + i * settings.LOGIN_THROTTLE_MAX_DELAY
+        assert await fail_login(throttle, "warga@example.com", None) == 0
+
+    last = clock.return_value
+    assert await fail_login(throttle, "warga@example.com", None) == NOW + window - last
+    assert metrics.get("login_throttle_lockouts") == lockouts + 1
+
+    clock.return_value = NOW + window + 1
+    assert await fail_login(throttle, "warga@example.com", None) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_burst_reaches_password_check_only_for_free_attempts(
+    fake_redis, clock
+):
+    throttle = LoginThrottle()
+    verified = []
+
+    async def login():
+        wait, attempt = await throttle.reserve("warga@example.com", "10.0.0.1")
+        if wait:
+            return
+        # the bcrypt verification of a wrong password
+        await asyncio.sleep(0)
+        verified.append(attempt)
+        throttle.record_failure()
+
+    await asyncio.gather(*(login() for _ in range(20)))
+
+    assert len(verified) == settings.LOGIN_THROTTLE_FREE_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_reserve_fails_open_when_redis_is_down():
+    with patch.object(
+        rate_limiter_module,
+        "reserve_login_attempt_script",
+        side_effect=redis.exceptions.ConnectionError("down"),
+    ):
+        assert await LoginThrottle().reserve("warga@example.com", "10.0.0.1") == (
+            0,
+            None,
+        )
+
+
+@pytest.mark.asyncio
+async def test_failures_on_many_accounts_do_not_delay_a_fresh_account_on_the_ip(
+    fake_redis, clock
+):
+    throttle = LoginThrottle()
+    # a campus NAT where several users each use up their own free attempts
+    accounts = (
+        settings.LOGIN_THROTTLE_IP_FREE_ATTEMPTS - 1
+    ) // settings.LOGIN_THROTTLE_FREE_ATTEMPTS
+    for i in range(accounts):
+        for _ in range(settings.LOGIN_THROTTLE_FREE_ATTEMPTS):
+            assert await fail_login(throttle, f"warga{i}@example.com", "10.0.0.1") == 0
+
+    wait, attempt = await throttle.reserve("fresh@example.com", "10.0.0.1")
+    assert wait == 0 and attempt
+
+
+@pytest.mark.asyncio
+async def test_ip_is_delayed_past_its_own_free_attempts(fake_redis, clock):
+    throttle = LoginThrottle()
+    for i in range(settings.LOGIN_THROTTLE_IP_FREE_ATTEMPTS):
+        await fail_login(throttle, f"warga{i}@example.com", "10.0.0.1")
+
+    wait, attempt = await throttle.reserve("fresh@example.com", "10.0.0.1")
+    assert wait > 0 and attempt is None
+
+
+def request_from(peer, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+
+def test_client_ip_ignores_forwarded_header_from_untrusted_peer():
+    with patch.object(settings, "LOGIN_THROTTLE_TRUSTED_PROXIES", "10.0.0.0/8"):
+        assert client_ip(request_from("203.0.113.9", "1.2.3.4")) == "203.0.113.9"
+
+
+def test_client_ip_takes_the_first_untrusted_hop_behind_the_proxies():
+    with patch.object(
+        settings, "LOGIN_THROTTLE_TRUSTED_PROXIES", "10.0.0.0/8, 172.16.0.1"
+    ):
+        request = request_from("10.0.0.2", "6.6.6.6, 203.0.113.9, 172.16.0.1")
+
+        assert client_ip(request) == "203.0.113.9"
+
+
+def test_client_ip_uses_the_peer_without_trusted_proxies():
+    with patch.object(settings, "LOGIN_THROTTLE_TRUSTED_PROXIES", None):
+        assert client_ip(request_from("10.0.0.2", "6.6.6.6")) == "10.0.0.2"
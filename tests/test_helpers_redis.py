@@ -0,0 +1,228 @@
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+import redis.exceptions
+from fastapi import HTTPException
+
+from helpers import redis as redis_module
+from helpers.config import settings
+from helpers.redis import (
+    OTP_EXPIRED,
+    OTP_INVALID,
+    OTP_LOCKED,
+    OTP_SEND_ALLOWED,
+    OTP_SEND_COOLDOWN,
+    OTP_SEND_LIMITED,
+    OTP_VALID,
+    RESERVE_OTP_SEND_SCRIPT,
+    VERIFY_OTP_SCRIPT,
+    consume_oauth_state,
+    reserve_otp_send,
+    store_oauth_state,
+    store_otp,
+    verify_and_consume_otp,
+)
+
+
+class FakePipeline:
+    def __init__(self):
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.fixture
+def fake_redis():
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    with patch.object(redis_module, "redis_client", fake), patch.object(
+        redis_module, "verify_otp_script", fake.register_script(VERIFY_OTP_SCRIPT)
+    ), patch.object(
+        redis_module,
+        "reserve_otp_send_script",
+        fake.register_script(RESERVE_OTP_SEND_SCRIPT),
+    ):
+        yield fake
+
+
+@pytest.mark.asyncio
+async def test_store_otp_resets_code_and_attempts_in_one_transaction():
+    pipe = FakePipeline()
+
+    with patch.object(redis_module.redis_client, "pipeline", return_value=pipe):
+        assert await store_otp("user-1", "123456")
+
+    assert pipe.commands == [
+        ("delete", ("otp:user-1",), {}),
+        ("hset", ("otp:user-1",), {"mapping": {"code": "123456", "attempts": 0}}),
+        ("expire", ("otp:user-1", settings.OTP_TTL_SECONDS), {}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_verify_runs_a_single_script_call():
+    script = AsyncMock(return_value=1)
+
+    with patch.object(redis_module, "verify_otp_script", script):
+        assert await verify_and_consume_otp("user-1", "123456") == OTP_VALID
+
+    script.assert_awaited_once_with(
+        keys=["otp:user-1"], args=["123456", settings.OTP_MAX_ATTEMPTS]
+    )
+
+
+@pytest.mark.asyncio
+async def test_verify_reports_lockout():
+    with patch.object(redis_module, "verify_otp_script", AsyncMock(return_value=-2)):
+        assert await verify_and_consume_otp("user-1", "000000") == OTP_LOCKED
+
+
+@pytest.mark.asyncio
+async def test_otp_is_consumed_by_the_first_valid_use(fake_redis):
+    await store_otp("user-1", "123456")
+
+    assert await verify_and_consume_otp("user-1", "123456") == OTP_VALID
+    assert await verify_and_consume_otp("user-1", "123456") == OTP_EXPIRED
+
+
+@pytest.mark.asyncio
+async def test_wrong_code_counts_an_attempt(fake_redis):
+    await store_otp("user-1", "123456")
+
+    assert await verify_and_consume_otp("user-1", "000000") == OTP_INVALID
+    assert await fake_redis.hget("otp:user-1", "attempts") == "1"
+    assert await verify_and_consume_otp("user-1", "123456") == OTP_VALID
+
+
+@pytest.mark.asyncio
+async def test_otp_is_locked_after_max_attempts(fake_redis):
+    await store_otp("user-1", "123456")
+
+    for _ in range(settings.OTP_MAX_ATTEMPTS - 1):
+        assert await verify_and_consume_otp("user-1", "000000") == OTP_INVALID
+    assert await verify_and_consume_otp("user-1", "000000") == OTP_LOCKED
+    assert await verify_and_consume_otp("user-1", "123456") == OTP_EXPIRED
+
+
+@pytest.mark.asyncio
+async def test_missing_or_legacy_otp_is_expired(fake_redis):
+    assert await verify_and_consume_otp("user-1", "123456") == OTP_EXPIRED
+
+    # codes stored as plain strings before the hash layout
+    await fake_redis.set("otp:user-1", "123456")
+    assert await verify_and_consume_otp("user-1", "123456") == OTP_EXPIRED
+
+
+@pytest.mark.asyncio
+async def test_verify_surfaces_redis_errors_as_http_errors():
+    script = AsyncMock(side_effect=redis.exceptions.ConnectionError("down"))
+
+    with patch.object(redis_module, "verify_otp_script", script), pytest.raises(
+        HTTPException
+    ) as exc:
+        await verify_and_consume_otp("user-1", "123456")
+
+    assert exc.value.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_reserve_otp_send_uses_cooldown_and_budget_keys():
+    script = AsyncMock(return_value=[1, settings.OTP_TTL_SECONDS, 60])
+
+    with patch.object(redis_module, "reserve_otp_send_script", script):
+        assert await reserve_otp_send("user-1") == (
+            OTP_SEND_ALLOWED,
+            settings.OTP_TTL_SECONDS,
+            60,
+        )
+
+    assert script.await_args.kwargs["keys"] == [
+        "otp:user-1",
+        "otp:cooldown:user-1",
+        "otp:budget:user-1",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reserve_otp_send_inside_cooldown_returns_remaining_ttl():
+    script = AsyncMock(return_value=[0, 241, 12])
+
+    with patch.object(redis_module, "reserve_otp_send_script", script):
+        assert await reserve_otp_send("user-1") == (OTP_SEND_COOLDOWN, 241, 12)
+
+
+@pytest.mark.asyncio
+async def test_reserve_otp_send_clamps_missing_key_ttls():
+    # TTL is -2 when the OTP already expired or was consumed
+    script = AsyncMock(return_value=[0, -2, 12])
+
+    with patch.object(redis_module, "reserve_otp_send_script", script):
+        assert await reserve_otp_send("user-1") == (OTP_SEND_COOLDOWN, 0, 12)
+
+
+@pytest.mark.asyncio
+async def test_oauth_state_is_written_in_one_round_trip():
+    pipe = FakePipeline()
+
+    with patch.object(redis_module.redis_client, "pipeline", return_value=pipe):
+        await store_oauth_state("state-1", {"redirect_uri": "https://app/", "path": ""})
+
+    assert pipe.commands == [
+        (
+            "hset",
+            ("oauth_state:state-1",),
+            {"mapping": {"redirect_uri": "https://app/", "path": ""}},
+        ),
+        ("expire", ("oauth_state:state-1", 3600), {}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_oauth_state_is_consumed_once():
+    pipe = FakePipeline()
+    pipe.execute = AsyncMock(return_value=[{"redirect_uri": "https://app/"}, 1])
+
+    with patch.object(redis_module.redis_client, "pipeline", return_value=pipe):
+        assert await consume_oauth_state("state-1") == {"redirect_uri": "https://app/"}
+
+    assert [name for name, _, _ in pipe.commands] == ["hgetall", "delete"]
+
+
+@pytest.mark.asyncio
+async def test_resend_inside_cooldown_reports_the_current_otp(fake_redis):
+    assert await reserve_otp_send("user-1") == (
+        OTP_SEND_ALLOWED,
+        settings.OTP_TTL_SECONDS,
+        settings.OTP_RESEND_COOLDOWN_SECONDS,
+    )
+    await store_otp("user-1", "123456")
+
+    outcome, expires_in, retry_after = await reserve_otp_send("user-1")
+
+    assert outcome == OTP_SEND_COOLDOWN
+    assert 0 < expires_in <= settings.OTP_TTL_SECONDS
+    assert 0 < retry_after <= settings.OTP_RESEND_COOLDOWN_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_hourly_budget_limits_sends_after_cooldown(fake_redis):
+    for _ in range(settings.OTP_HOURLY_SEND_LIMIT):
+        assert (await reserve_otp_send("user-1"))[0] == OTP_SEND_ALLOWED
+        # the cooldown has passed
+        await fake_redis.delete("otp:cooldown:user-1")
+
+    outcome, _, retry_after = await reserve_otp_send("user-1")
+
+    assert outcome == OTP_SEND_LIMITED
+    assert 0 < retry_after <= 3600
+    assert not await fake_redis.exists("otp:cooldown:user-1")
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from helpers.singleflight import SingleFlight
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test", client=FakeRedis())
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    results = await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+
+    assert calls == 1
+    assert results == [{"value": 42}] * 5
+
+
+@pytest.mark.asyncio
+async def test_result_of_a_finished_flight_is_not_reused():
+    client = FakeRedis()
+    client.store["test:result:key"] = json.dumps({"value": "from-old-leader"})
+    flight = SingleFlight("test", client=client)
+
+    async def work():
+        return {"value": "fresh"}
+
+    assert await flight.do("key", work) == {"value": "fresh"}
+
+
+@pytest.mark.asyncio
+async def test_result_is_published_only_briefly():
+    client = FakeRedis()
+    published = {}
+    set_value = client.set
+
+    async def record_set(key, value, nx=False, ex=None):
+        published[key] = ex
+        return await set_value(key, value, nx=nx, ex=ex)
+
+    client.set = record_set
+    flight = SingleFlight("test", client=client)
+
+    async def work():
+        return "done"
+
+    await flight.do("key", work)
+
+    assert published["test:result:key"] <= 5
+
+
+@pytest.mark.asyncio
+async def test_follower_waits_for_remote_leader_result():
+    client = FakeRedis()
+    client.store["test:lock:key"] = "other-worker"
+    flight = SingleFlight("test", client=client, poll_interval=0.01)
+
+    async def publish_later():
+        await asyncio.sleep(0.05)
+        client.store["test:result:key"] = json.dumps("done")
+        del client.store["test:lock:key"]
+
+    async def work():
+        raise AssertionError("follower must not call the dependency")
+
+    publisher = asyncio.create_task(publish_later())
+    assert await flight.do("key", work) == "done"
+    await publisher
+
+
+@pytest.mark.asyncio
+async def test_leader_releases_lock_on_failure():
+    client = FakeRedis()
+    flight = SingleFlight("test", client=client)
+
+    async def work():
+        raise RuntimeError("n8n down")
+
+    with pytest.raises(RuntimeError):
+        await flight.do("key", work)
+
+    assert "test:lock:key" not in client.store
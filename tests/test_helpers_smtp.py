@@ -0,0 +1,112 @@
+from email.message import Message
+from unittest.mock import patch
+
+import aiosmtplib
+import pytest
+from fastapi_mail import ConnectionConfig
+
+from helpers.smtp import SmtpConnectionPool
+
+CONFIG = ConnectionConfig(
+    MAIL_USERNAME="user",
+    MAIL_PASSWORD="secret",
+    MAIL_FROM="noreply@example.com",
+    MAIL_PORT=587,
+    MAIL_SERVER="smtp.example.com",
+    MAIL_STARTTLS=True,
+    MAIL_SSL_TLS=False,
+)
+
+
+class FakeSession:
+    def __init__(self, failures=None):
+        self.is_connected = True
+        self.sent = []
+        self.failures = failures or {}
+
+    async def send_message(self, message):
+        failure = self.failures.pop(message["To"], None)
+        if failure:
+            if isinstance(failure, aiosmtplib.SMTPServerDisconnected):
+                self.is_connected = False
+            raise failure
+        self.sent.append(message["To"])
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+def message(to):
+    msg = Message()
+    msg["To"] = to
+    return msg
+
+
+def pool_with(sessions, **kwargs):
+    pool = SmtpConnectionPool(CONFIG, **kwargs)
+    connects = iter(sessions)
+
+    async def connect():
+        return next(connects)
+
+    return pool, patch.object(pool, "_connect", connect)
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused_between_sends():
+    session = FakeSession()
+    pool, connect = pool_with([session])
+
+    with connect:
+        assert await pool.send_messages([message("a@b.co")]) == [None]
+        assert await pool.send_messages([message("c@d.co"), message("e@f.co")]) == [
+            None,
+            None,
+        ]
+
+    assert session.sent == ["a@b.co", "c@d.co", "e@f.co"]
+    assert pool.stats()["idle"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reconnects_and_resumes_queue_after_disconnect():
+    broken = FakeSession({"b@b.co": aiosmtplib.SMTPServerDisconnected("gone")})
+    fresh = FakeSession()
+    pool, connect = pool_with([broken, fresh])
+
+    with connect:
+        errors = await pool.send_messages(
+            [message("a@b.co"), message("b@b.co"), message("c@b.co")]
+        )
+
+    assert errors == [None, None, None]
+    assert broken.sent == ["a@b.co"]
+    assert fresh.sent == ["b@b.co", "c@b.co"]
+
+
+@pytest.mark.asyncio
+async def test_refused_recipient_does_not_abort_the_queue():
+    session = FakeSession({"bad@b.co": aiosmtplib.SMTPRecipientsRefused([])})
+    pool, connect = pool_with([session])
+
+    with connect:
+        errors = await pool.send_messages([message("bad@b.co"), message("ok@b.co")])
+
+    assert errors[0] is not None
+    assert errors[1] is None
+    assert session.sent == ["ok@b.co"]
+
+
+@pytest.mark.asyncio
+async def test_session_is_recycled_after_max_messages():
+    first, second = FakeSession(), FakeSession()
+    pool, connect = pool_with([first, second], max_messages=2)
+
+    with connect:
+        await pool.send_messages([message(f"{i}@b.co") for i in range(3)])
+
+    assert first.sent == ["0@b.co", "1@b.co"]
+    assert second.sent == ["2@b.co"]
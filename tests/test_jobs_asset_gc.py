@@ -0,0 +1,100 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from helpers.cloudinary import public_id_from_url
+from jobs import asset_gc
+
+NOW = datetime(2025, 1, 10, tzinfo=timezone.utc)
+CUTOFF = NOW - timedelta(hours=24)
+
+
+def test_public_id_from_url():
+    url = "https://res.cloudinary.com/demo/image/upload/v1712/reports/images/abc.jpg"
+    assert public_id_from_url(url) == "reports/images/abc"
+    assert public_id_from_url("https://lh3.googleusercontent.com/a/xyz") is None
+    assert public_id_from_url(None) is None
+
+
+def test_drive_file_id_from_url():
+    assert (
+        asset_gc.drive_file_id_from_url(
+            "https://drive.google.com/uc?id=FILE123&export=download"
+        )
+        == "FILE123"
+    )
+    assert (
+        asset_gc.drive_file_id_from_url("https://drive.google.com/file/d/FILE456/view")
+        == "FILE456"
+    )
+    assert asset_gc.drive_file_id_from_url("https://example.com/report.pdf") is None
+
+
+def test_find_orphans_skips_referenced_and_recent_assets():
+    assets = [
+        {"public_id": "reports/images/used", "created_at": "2025-01-01T00:00:00Z"},
+        {"public_id": "reports/images/orphan", "created_at": "2025-01-01T00:00:00Z"},
+        {"public_id": "reports/images/fresh", "created_at": "2025-01-09T23:00:00Z"},
+        {"public_id": "reports/images/unknown"},
+    ]
+
+    orphans = asset_gc.find_orphans(
+        assets, {"reports/images/used"}, CUTOFF, "public_id", "created_at"
+    )
+
+    assert orphans == ["reports/images/orphan"]
+
+
+@pytest.mark.asyncio
+async def test_delete_in_batches_dry_run_does_not_delete():
+    delete = AsyncMock()
+    with patch.object(asset_gc.settings, "ASSET_GC_BATCH_INTERVAL_SECONDS", 0):
+        deleted = await asset_gc._delete_in_batches(
+            ["a", "b", "c"], 2, delete, "images", dry_run=True
+        )
+
+    assert deleted == 0
+    delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_delete_in_batches_respects_limit():
+    delete = AsyncMock()
+    with patch.object(asset_gc.settings, "ASSET_GC_BATCH_INTERVAL_SECONDS", 0):
+        deleted = await asset_gc._delete_in_batches(
+            ["a", "b", "c"], 2, delete, "images", dry_run=False
+        )
+
+    assert deleted == 3
+    assert [call.args[0] for call in delete.call_args_list] == [["a", "b"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_image_referenced_only_by_feedback_is_kept():
+    feedback_image = (
+        "https://res.cloudinary.com/demo/image/upload/v1712/uploads/old-avatar.jpg"
+    )
+    # reports, users, feedback entries, report images
+    results = [[], [], [(feedback_image,)], []]
+    db = MagicMock()
+    db.execute = AsyncMock(
+        side_effect=[MagicMock(all=MagicMock(return_value=r)) for r in results]
+    )
+
+    @asynccontextmanager
+    async def session():
+        yield db
+
+    with patch.object(asset_gc.db_connection, "get_db_session", session):
+        referenced = await asset_gc.collect_referenced_assets()
+
+    assets = [{"public_id": "uploads/old-avatar", "created_at": "2025-01-01T00:00:00Z"}]
+    assert "uploads/old-avatar" in referenced["images"]
+    assert (
+        asset_gc.find_orphans(
+            assets, referenced["images"], CUTOFF, "public_id", "created_at"
+        )
+        == []
+    )
@@ -0,0 +1,139 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from helpers.onesignal import EmailMessage, OneSignalError
+from jobs import notification_outbox
+from models.notification_outbox import OutboxStatus
+from services.notification_outbox import NotificationOutboxService
+
+NOW = datetime(2025, 1, 10, tzinfo=timezone.utc)
+
+
+@asynccontextmanager
+async def fake_session():
+    yield MagicMock()
+
+
+def notification(id, kind="otp_email", attempts=1):
+    return {
+        "id": id,
+        "kind": kind,
+        "payload": {"email": f"{id}@example.com"},
+        "attempts": attempts,
+        "created_at": NOW,
+    }
+
+
+def test_retry_delay_grows_exponentially_and_is_capped():
+    with patch("services.notification_outbox.settings") as settings:
+        settings.OUTBOX_BACKOFF_SECONDS = 10
+        settings.OUTBOX_MAX_BACKOFF_SECONDS = 60
+
+        assert NotificationOutboxService.retry_delay(1) == timedelta(seconds=10)
+        assert NotificationOutboxService.retry_delay(2) == timedelta(seconds=20)
+        assert NotificationOutboxService.retry_delay(3) == timedelta(seconds=40)
+        assert NotificationOutboxService.retry_delay(4) == timedelta(seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_batch_marks_sent_retried_and_skipped():
+    batch = [notification("ok"), notification("fail"), notification("gone")]
+
+    async def build(item):
+        if item["id"] == "gone":
+            raise notification_outbox.NotificationSkipped("user deleted")
+        return EmailMessage(item["payload"]["email"], "Subject", item["id"])
+
+    sent_to = []
+
+    async def send_email(email_to, subject, html_body, idempotency_key):
+        if email_to == ["fail@example.com"]:
+            raise OneSignalError("provider down")
+        sent_to.extend(email_to)
+
+    with patch.object(
+        notification_outbox.db_connection, "get_db_session", fake_session
+    ), patch.object(notification_outbox, "_build", build), patch.object(
+        notification_outbox.OneSignalClient, "send_email", send_email
+    ), patch.object(
+        NotificationOutboxService, "claim_batch", AsyncMock(return_value=batch)
+    ), patch.object(
+        NotificationOutboxService,
+        "mark_failed",
+        AsyncMock(return_value=OutboxStatus.pending),
+    ) as mark_failed, patch.object(
+        NotificationOutboxService, "mark_skipped", AsyncMock()
+    ) as mark_skipped, patch.object(
+        NotificationOutboxService, "mark_sent", AsyncMock()
+    ) as mark_sent:
+        summary = await notification_outbox.dispatch_batch(limit=10)
+
+    assert summary == {
+        "claimed": 3,
+        "sent": 1,
+        "skipped": 1,
+        "retried": 1,
+        "dead": 0,
+    }
+    mark_sent.assert_awaited_once()
+    assert mark_sent.await_args.args[1] == ["ok"]
+    assert mark_skipped.await_args.args[1]["id"] == "gone"
+    assert mark_skipped.await_args.args[2] == "user deleted"
+    assert mark_failed.await_args.args[1]["id"] == "fail"
+    assert mark_failed.await_args.args[2] == "provider down"
+    assert sent_to == ["ok@example.com"]
+
+
+def test_idempotency_key_is_stable_until_the_email_changes():
+    message = EmailMessage("a@b.co", "Kode OTP Anda", "123456")
+    key = notification_outbox.idempotency_key(notification("row-1"), message)
+
+    assert key == notification_outbox.idempotency_key(notification("row-1"), message)
+    assert key != notification_outbox.idempotency_key(notification("row-2"), message)
+    assert key != notification_outbox.idempotency_key(
+        notification("row-1"), EmailMessage("a@b.co", "Kode OTP Anda", "654321")
+    )
+
+
+@pytest.mark.asyncio
+async def test_dispatch_batch_counts_dead_letters():
+    async def deliver(item):
+        raise RuntimeError("rejected")
+
+    with patch.object(
+        notification_outbox.db_connection, "get_db_session", fake_session
+    ), patch.object(notification_outbox, "_deliver", deliver), patch.object(
+        NotificationOutboxService,
+        "claim_batch",
+        AsyncMock(return_value=[notification("last", attempts=6)]),
+    ), patch.object(
+        NotificationOutboxService,
+        "mark_failed",
+        AsyncMock(return_value=OutboxStatus.dead),
+    ), patch.object(
+        NotificationOutboxService, "mark_sent", AsyncMock()
+    ):
+        summary = await notification_outbox.dispatch_batch()
+
+    assert summary["dead"] == 1
+    assert summary["sent"] == 0
+
+
+@pytest.mark.asyncio
+async def test_build_otp_skips_verified_users():
+    with patch.object(
+        notification_outbox.db_connection, "get_db_session", fake_session
+    ), patch(
+        "jobs.notification_outbox.UserService.get_user_by_email",
+        AsyncMock(return_value={"id": "user-1", "is_verified": True}),
+    ), patch(
+        "jobs.notification_outbox.mailer.build_otp_email", AsyncMock()
+    ) as build_otp_email, pytest.raises(
+        notification_outbox.NotificationSkipped
+    ):
+        await notification_outbox.build_otp(notification("verified"))
+
+    build_otp_email.assert_not_called()
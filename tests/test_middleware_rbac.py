@@ -0,0 +1,110 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from helpers.config import settings
+from helpers.jwt import JwtHelper
+from middleware.rbac_middleware import RBACMiddleware, compile_allowed_paths
+from permissions.model_permission import Users
+from services.auth import AuthService, PermissionChecker
+
+
+def token_for(role):
+    return JwtHelper().create_token({"id": "user-1", "email": "a@b.co", "role": role})
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(RBACMiddleware, jwt_secret=settings.JWT_SECRET)
+
+    @app.get("/v1/users")
+    def list_users(request: Request):
+        return request.state.user
+
+    @app.delete("/v1/users/{user_id}")
+    def delete_user(user=Depends(PermissionChecker([Users.permissions.DELETE]))):
+        return user
+
+    @app.post("/v1/auth/login")
+    def login():
+        return {"public": True}
+
+    @app.get("/docs-page")
+    def outside_api():
+        return {"public": True}
+
+    with patch.object(AuthService, "is_token_revoked", AsyncMock(return_value=False)):
+        yield TestClient(app)
+
+
+def test_allowed_paths_match_with_and_without_prefix():
+    pattern = compile_allowed_paths(["/auth/*", "/feedback-user"], "/v1")
+
+    assert pattern.match("/v1/auth/login")
+    assert pattern.match("/auth/google/callback")
+    assert pattern.match("/v1/feedback-user/")
+    assert not pattern.match("/v1/feedback-user/1")
+    assert not pattern.match("/v1/authors")
+
+
+def test_public_paths_pass_without_token(client):
+    assert client.post("/v1/auth/login").json() == {"public": True}
+    assert client.get("/docs-page").json() == {"public": True}
+
+
+def test_missing_token_is_rejected(client):
+    response = client.get("/v1/users")
+
+    assert response.status_code == 401
+
+
+def test_preflight_passes_without_token(client):
+    response = client.options("/v1/users")
+
+    assert response.status_code != 401
+
+
+def test_verified_user_is_put_in_request_state(client):
+    response = client.get(
+        "/v1/users", headers={"Authorization": f"Bearer {token_for('user')}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["id"] == "user-1"
+    assert response.json()["role"] == "user"
+
+
+def test_permission_checker_reuses_the_verified_user(client):
+    with patch.object(AuthService, "get_token_claims") as decode:
+        admin = client.delete(
+            "/v1/users/2", headers={"Authorization": f"Bearer {token_for('admin')}"}
+        )
+        user = client.delete(
+            "/v1/users/2", headers={"Authorization": f"Bearer {token_for('user')}"}
+        )
+
+    assert admin.status_code == 200
+    assert user.status_code == 403
+    decode.assert_not_called()
+
+
+def test_refresh_token_is_not_an_access_token(client):
+    refresh_token = JwtHelper().create_refresh_token("user-1", "family-1", "jti-1")
+
+    response = client.get(
+        "/v1/users", headers={"Authorization": f"Bearer {refresh_token}"}
+    )
+
+    assert response.status_code == 401
+
+
+def test_revoked_token_is_rejected(client):
+    with patch.object(AuthService, "is_token_revoked", AsyncMock(return_value=True)):
+        response = client.get(
+            "/v1/users", headers={"Authorization": f"Bearer {token_for('admin')}"}
+        )
+
+    assert response.status_code == 401
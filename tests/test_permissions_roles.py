@@ -0,0 +1,43 @@
+from permissions.model_permission import Metrics, Reports, Users, UsersProfile
+from permissions.roles import (
+    ROLE_PERMISSIONS,
+    Role,
+    get_role_permissions,
+    has_permissions,
+    permission_mask,
+)
+
+
+def test_role_permissions_are_interned_frozensets():
+    permissions = get_role_permissions(Role.USER)
+
+    assert isinstance(permissions, frozenset)
+    assert permissions is get_role_permissions("user")
+    assert "USERS_PROFILE_READ" in permissions
+    assert Reports.permissions.CREATE in permissions
+
+
+def test_role_permission_sets_match_role_definitions():
+    for role, permissions_groups in ROLE_PERMISSIONS.items():
+        expected = {str(p) for group in permissions_groups for p in group}
+        assert get_role_permissions(role) == expected
+
+
+def test_masks_require_every_permission():
+    mask = permission_mask([Users.permissions.READ, Metrics.permissions.READ])
+
+    assert has_permissions(Role.ADMINISTRATOR, mask)
+    assert not has_permissions(Role.USER, mask)
+    assert has_permissions(Role.USER, permission_mask([Users.permissions.UPDATE]))
+
+
+def test_unknown_role_has_no_permissions():
+    assert get_role_permissions(None) == frozenset()
+    assert not has_permissions("guest", permission_mask([Users.permissions.READ]))
+
+
+def test_permission_full_name_is_cached_on_the_shared_instance():
+    permission = UsersProfile.permissions.READ
+
+    assert permission is UsersProfile.permissions.READ
+    assert permission.full_name == "USERS_PROFILE_READ"
@@ -0,0 +1,35 @@
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from routes import auth as auth_routes
+from services.auth import AuthService
+
+
+def auth_client():
+    app = FastAPI()
+    app.include_router(auth_routes.routes_auth, prefix="/v1")
+    app.dependency_overrides[auth_routes.get_db] = lambda: None
+    return TestClient(app)
+
+
+def test_invalid_oauth_state_redirects_to_frontend():
+    authenticate = AsyncMock()
+
+    with patch.object(
+        auth_routes, "consume_oauth_state", AsyncMock(return_value={})
+    ), patch.object(
+        auth_routes.GoogleAuth, "get_frontend_uri", return_value="https://app.test/"
+    ), patch.object(
+        AuthService, "authenticate_with_google", authenticate
+    ):
+        response = auth_client().get(
+            "/v1/auth/google/callback",
+            params={"code": "code-1", "state": "replayed"},
+            follow_redirects=False,
+        )
+
+    assert response.status_code in (302, 307)
+    assert response.headers["location"].startswith("https://app.test/")
+    authenticate.assert_not_awaited()
@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from helpers.n8n import n8n_bulkhead
+from routes import reports as reports_routes
+from schemas.reports import DescriptionRequest
+from services.description import DescriptionService, format_sse
+
+
+class DisconnectingRequest:
+    """
+    The client goes away after the first event
+    """
+
+    def __init__(self):
+        self.checks = 0
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks > 1
+
+
+async def endless_stream(self, request_payload):
+    async with n8n_bulkhead.acquire():
+        while True:
+            yield format_sse({"content": "chunk"}, "chunk")
+
+
+@pytest.mark.asyncio
+async def test_disconnect_releases_the_bulkhead_slot():
+    generate_request = DescriptionRequest(
+        user_id="user-1",
+        category_key="jalan",
+        district_id="district-1",
+        village_id="village-1",
+        description="Jalan berlubang di depan sekolah",
+        location="Jl. Dago No. 1",
+    )
+
+    with patch.object(
+        reports_routes,
+        "build_description_payload",
+        AsyncMock(return_value={"report_id": "report-1"}),
+    ), patch.object(DescriptionService, "stream", endless_stream), patch.object(
+        DescriptionService, "is_available", return_value=True
+    ):
+        response = await reports_routes.generate_description_stream(
+            DisconnectingRequest(), generate_request
+        )
+        events = [event async for event in response.body_iterator]
+
+    assert len(events) == 1
+    assert n8n_bulkhead.stats()["active"] == 0
@@ -0,0 +1,267 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+import redis.asyncio as redis
+from fastapi import HTTPException
+from jose import JWTError
+
+from helpers.jwt import JwtHelper
+from helpers.metrics import metrics
+from permissions.model_permission import Users
+from services import auth as auth_module
+from services.auth import ROTATE_REFRESH_SCRIPT, AuthService, PermissionChecker
+
+
+def bare_request():
+    # no RBACMiddleware in front, nothing in the request state
+    return SimpleNamespace(state=SimpleNamespace())
+
+
+def token_for(role, issued_at=None):
+    token = JwtHelper().create_token({"id": "user-1", "email": "a@b.co", "role": role})
+    if issued_at is None:
+        return token
+    claims = JwtHelper().decode(token)
+    claims["iat"] = issued_at
+    return JwtHelper().encode(claims)
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+
+    def set(self, key, value, ex=None):
+        self.store[key] = str(value)
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+    async def execute(self):
+        return []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.fixture
+def fake_redis():
+    store = {}
+
+    async def get(key):
+        return store.get(key)
+
+    async def set(key, value, ex=None):
+        store[key] = str(value)
+
+    async def smembers(key):
+        return store.get(key, frozenset())
+
+    with patch.object(auth_module.redis_client, "get", side_effect=get), patch.object(
+        auth_module.redis_client, "set", side_effect=set
+    ), patch.object(
+        auth_module.redis_client, "smembers", side_effect=smembers
+    ), patch.object(
+        auth_module.redis_client,
+        "pipeline",
+        side_effect=lambda **_: FakePipeline(store),
+    ):
+        yield store
+
+
+@pytest.mark.asyncio
+async def test_permission_checker_authorizes_from_claims_without_database(fake_redis):
+    with patch.object(AuthService, "load_user", AsyncMock()) as load_user:
+        user = await PermissionChecker([Users.permissions.DELETE])(
+            bare_request(), token_for("admin")
+        )
+
+    assert user["id"] == "user-1"
+    assert user["role"] == "admin"
+    load_user.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_permission_checker_rejects_missing_permission(fake_redis):
+    with pytest.raises(HTTPException) as exc:
+        await PermissionChecker([Users.permissions.DELETE])(
+            bare_request(), token_for("user")
+        )
+
+    assert exc.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_invalid_token_is_unauthorized(fake_redis):
+    with pytest.raises(HTTPException) as exc:
+        await PermissionChecker([Users.permissions.READ])(bare_request(), "not-a-token")
+
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_tokens_issued_before_revocation_are_rejected(fake_redis):
+    old_token = token_for("admin", issued_at=int(time.time()) - 60)
+    fake_redis["auth:refresh:user:user-1"] = {"family-1"}
+    fake_redis["auth:refresh:family-1"] = "jti-1"
+    await AuthService.revoke_user_tokens("user-1")
+    assert "auth:refresh:family-1" not in fake_redis
+
+    with pytest.raises(HTTPException) as exc:
+        await PermissionChecker([Users.permissions.READ])(bare_request(), old_token)
+    assert exc.value.status_code == 401
+
+    fresh_token = token_for("admin", issued_at=int(time.time()) + 1)
+    assert await PermissionChecker([Users.permissions.READ])(
+        bare_request(), fresh_token
+    )
+
+
+@pytest.mark.asyncio
+async def test_revocation_tells_apart_tokens_issued_in_the_same_second(fake_redis):
+    with patch.object(auth_module.time, "time", return_value=1_000_000.5):
+        await AuthService.revoke_user_tokens("user-1")
+
+    with pytest.raises(HTTPException):
+        await PermissionChecker([Users.permissions.READ])(
+            bare_request(), token_for("admin", issued_at=1_000_000.2)
+        )
+    assert await PermissionChecker([Users.permissions.READ])(
+        bare_request(), token_for("admin", issued_at=1_000_000.501)
+    )
+
+
+@pytest.mark.asyncio
+async def test_revocation_check_fails_open_when_redis_is_down():
+    with patch.object(
+        auth_module.redis_client,
+        "get",
+        AsyncMock(side_effect=redis.ConnectionError("down")),
+    ):
+        assert await PermissionChecker([Users.permissions.READ])(
+            bare_request(), token_for("admin")
+        )
+
+
+@pytest.mark.asyncio
+async def test_load_user_is_cached(fake_redis):
+    get_user = AsyncMock(return_value={"id": "user-1", "role": "user"})
+    auth_module._user_cache.clear()
+
+    with patch.object(auth_module.UserService, "get_user", get_user), patch.object(
+        auth_module.db_connection, "get_db_session"
+    ) as session:
+        session.return_value.__aenter__ = AsyncMock()
+        session.return_value.__aexit__ = AsyncMock(return_value=False)
+        first = await AuthService().load_user("user-1")
+        second = await AuthService().load_user("user-1")
+
+    assert first is second
+    get_user.assert_awaited_once()
+    auth_module._user_cache.clear()
+
+
+def refresh_claims(token_id="jti-1"):
+    token = JwtHelper().create_refresh_token("user-1", "family-1", token_id)
+    return JwtHelper().decode_refresh_token(token)
+
+
+@pytest.mark.asyncio
+async def test_rotation_issues_next_token_of_the_family():
+    rotate = AsyncMock(side_effect=lambda keys, args: [1, args[1]])
+    with patch.object(auth_module, "rotate_refresh_script", rotate):
+        next_token = await AuthService().rotate_refresh_token(refresh_claims())
+
+    claims = JwtHelper().decode_refresh_token(next_token)
+    assert claims["fam"] == "family-1"
+    assert claims["jti"] != "jti-1"
+    keys = rotate.await_args.kwargs["keys"]
+    args = rotate.await_args.kwargs["args"]
+    assert keys[0] == "auth:refresh:family-1"
+    assert args[:2] == ["jti-1", claims["jti"]]
+
+
+@pytest.mark.asyncio
+async def test_reused_refresh_token_is_rejected_and_counted():
+    reuse = metrics.get("refresh_token_reuse")
+
+    with patch.object(
+        auth_module, "rotate_refresh_script", AsyncMock(return_value=[-1, None])
+    ):
+        with pytest.raises(HTTPException) as exc:
+            await AuthService().rotate_refresh_token(refresh_claims())
+
+    assert exc.value.status_code == 401
+    assert metrics.get("refresh_token_reuse") == reuse + 1
+
+
+@pytest.fixture
+async def family_redis():
+    fake = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await fake.hset("auth:refresh:family-1", mapping={"jti": "jti-1", "sub": "user-1"})
+    await fake.sadd("auth:refresh:user:user-1", "family-1", "family-2")
+    with patch.object(
+        auth_module,
+        "rotate_refresh_script",
+        fake.register_script(ROTATE_REFRESH_SCRIPT),
+    ):
+        yield fake
+
+
+@pytest.mark.asyncio
+async def test_reuse_removes_the_family_from_the_user_families(family_redis):
+    grace = auth_module.settings.JWT_REFRESH_GRACE_SECONDS
+    await AuthService().rotate_refresh_token(refresh_claims("jti-1"))
+    # the grace period of the rotation is over
+    await family_redis.hset(
+        "auth:refresh:family-1", "rotated_at", time.time() - grace - 1
+    )
+    with pytest.raises(HTTPException):
+        await AuthService().rotate_refresh_token(refresh_claims("jti-1"))
+
+    assert not await family_redis.exists("auth:refresh:family-1")
+    assert await family_redis.smembers("auth:refresh:user:user-1") == {"family-2"}
+
+
+@pytest.mark.asyncio
+async def test_back_to_back_refreshes_with_the_same_token_share_the_next_one(
+    family_redis,
+):
+    # two tabs sending the same cookie at once
+    first = await AuthService().rotate_refresh_token(refresh_claims("jti-1"))
+    second = await AuthService().rotate_refresh_token(refresh_claims("jti-1"))
+
+    first_jti = JwtHelper().decode_refresh_token(first)["jti"]
+    assert JwtHelper().decode_refresh_token(second)["jti"] == first_jti
+    assert await family_redis.hget("auth:refresh:family-1", "jti") == first_jti
+
+    # the shared token keeps rotating normally
+    assert await AuthService().rotate_refresh_token(refresh_claims(first_jti))
+
+
+@pytest.mark.asyncio
+async def test_token_older_than_the_previous_one_is_reuse(family_redis):
+    second = await AuthService().rotate_refresh_token(refresh_claims("jti-1"))
+    second_jti = JwtHelper().decode_refresh_token(second)["jti"]
+    await AuthService().rotate_refresh_token(refresh_claims(second_jti))
+
+    with pytest.raises(HTTPException):
+        await AuthService().rotate_refresh_token(refresh_claims("jti-1"))
+    assert not await family_redis.exists("auth:refresh:family-1")
+
+
+@pytest.mark.asyncio
+async def test_refresh_and_access_tokens_are_not_interchangeable(fake_redis):
+    refresh_token = JwtHelper().create_refresh_token("user-1", "family-1", "jti-1")
+
+    with pytest.raises(HTTPException) as exc:
+        await PermissionChecker([Users.permissions.READ])(bare_request(), refresh_token)
+    assert exc.value.status_code == 401
+
+    with pytest.raises(JWTError):
+        JwtHelper().decode_refresh_token(token_for("admin"))
@@ -0,0 +1,89 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from services import description as description_module
+from services.description import DescriptionService, format_sse
+
+PAYLOAD = {
+    "report_id": "report-1",
+    "category_name": "Infrastruktur Rusak",
+    "district_name": "Coblong",
+    "village_name": "Dago",
+    "description": "Jalan   berlubang di depan sekolah",
+    "location": "Jl. Dago No. 1",
+}
+
+
+def test_cache_key_ignores_report_id_case_and_whitespace():
+    other = {
+        **PAYLOAD,
+        "report_id": "report-2",
+        "description": "  jalan berlubang di DEPAN sekolah ",
+    }
+
+    assert DescriptionService.cache_key(PAYLOAD) == DescriptionService.cache_key(other)
+
+
+def test_cache_key_differs_for_different_location():
+    other = {**PAYLOAD, "location": "Jl. Merdeka No. 2"}
+
+    assert DescriptionService.cache_key(PAYLOAD) != DescriptionService.cache_key(other)
+
+
+@pytest.mark.asyncio
+async def test_generate_returns_cached_result_without_calling_n8n():
+    service = DescriptionService()
+    cached = {"report_id": "old-report", "formal_description": "Cached"}
+
+    with patch.object(
+        service, "_get_cached", AsyncMock(return_value=cached)
+    ), patch.object(service, "_call_n8n", AsyncMock()) as mock_call:
+        result = await service.generate(PAYLOAD)
+
+    mock_call.assert_not_called()
+    assert result == {"report_id": "report-1", "formal_description": "Cached"}
+
+
+@pytest.mark.asyncio
+async def test_generate_caches_n8n_result_on_miss():
+    service = DescriptionService()
+    generated = {"report_id": "report-1", "formal_description": "Generated"}
+
+    with patch.object(
+        service, "_get_cached", AsyncMock(return_value=None)
+    ), patch.object(
+        service, "_call_n8n", AsyncMock(return_value=generated)
+    ), patch.object(
+        service, "_set_cached", AsyncMock()
+    ) as mock_set, patch.object(
+        description_module.description_flight,
+        "do",
+        lambda key, func: func(),
+    ):
+        result = await service.generate(PAYLOAD)
+
+    assert result == generated
+    mock_set.assert_awaited_once_with(DescriptionService.cache_key(PAYLOAD), generated)
+
+
+def test_chunk_content_extracts_content_from_json_lines():
+    assert (
+        DescriptionService._chunk_content('{"type": "item", "content": "Jalan"}')
+        == "Jalan"
+    )
+    assert DescriptionService._chunk_content("plain text") == "plain text"
+
+
+@pytest.mark.asyncio
+async def test_stream_serves_cached_result_as_single_event():
+    service = DescriptionService()
+    cached = {"report_id": "old-report", "formal_description": "Cached"}
+
+    with patch.object(service, "_get_cached", AsyncMock(return_value=cached)):
+        events = [event async for event in service.stream(PAYLOAD)]
+
+    assert events == [
+        format_sse({"report_id": "report-1", "formal_description": "Cached"}, "result"),
+        format_sse({"report_id": "report-1"}, "done"),
+    ]
@@ -0,0 +1,49 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from services import users as users_module
+from services.users import UserService
+
+USER = {"id": "user-1", "password": "$2b$04$old"}
+
+
+def session_returning(user_model):
+    db = MagicMock()
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = user_model
+    db.execute = AsyncMock(return_value=result)
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_check_password_rehashes_outdated_hash():
+    user_model = MagicMock(password=USER["password"])
+    db = session_returning(user_model)
+
+    with patch.object(
+        users_module,
+        "verify_and_update_password_async",
+        AsyncMock(return_value=(True, "$2b$12$new")),
+    ):
+        assert await UserService().check_password(db, USER, "secret")
+
+    assert user_model.password == "$2b$12$new"
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_check_password_leaves_current_hash_alone():
+    db = session_returning(MagicMock(password=USER["password"]))
+
+    with patch.object(
+        users_module,
+        "verify_and_update_password_async",
+        AsyncMock(return_value=(False, None)),
+    ):
+        assert not await UserService().check_password(db, USER, "wrong")
+
+    db.execute.assert_not_called()
+    db.commit.assert_not_called()